@@ -0,0 +1,52 @@
+import inquisitor.assets.block
+import inquisitor.assets.email
+import inquisitor.assets.host
+import inquisitor.assets.registrant
+import tabulate
+import time
+
+ROUNDS = 20
+
+def values(count):
+    # Mimics search results where the same few identifiers come up over and
+    # over along with some invalid ones
+    for i in range(count):
+        domain = 'Host{}.Example.com'.format(i % 50)
+        yield (inquisitor.assets.host, ' www.{} '.format(domain))
+        yield (inquisitor.assets.host, 'host{}.invalid-tld'.format(i % 10))
+        yield (inquisitor.assets.email, 'user{}@{}'.format(i % 20, domain))
+        yield (inquisitor.assets.registrant, u'Soci\xe9t\xe9 {}'.format(i % 30))
+        yield (inquisitor.assets.block, '10.0.{}.0/24'.format(i % 40))
+
+def run(canonicalize, items):
+    start = time.time()
+    for module, value in items:
+        try:
+            canonicalize(module)(value)
+        except Exception:
+            pass
+    return time.time() - start
+
+def main():
+    items = list(values(1000)) * ROUNDS
+    # Emails still canonicalize their domains through the memoized host
+    # function, which is why its memo is cleared before every call
+    def plain(module):
+        def canonicalize(value):
+            inquisitor.assets.host.canonicalize.memo.clear()
+            return module.canonicalize.function(value)
+        return canonicalize
+    uncached = run(plain, items)
+    cached = run(lambda module: module.canonicalize, items)
+    table = [['Mode', 'Values', 'Seconds', 'Microseconds/Value']]
+    for mode, elapsed in [('uncached', uncached), ('memoized', cached)]:
+        table.append([
+            mode,
+            len(items),
+            '{:.3f}'.format(elapsed),
+            '{:.1f}'.format(elapsed * 1000000 / len(items)),
+        ])
+    print tabulate.tabulate(table, headers='firstrow')
+
+if __name__ == '__main__':
+    main()
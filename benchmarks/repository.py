@@ -0,0 +1,358 @@
+import argparse
+import benchmarks.synthetic
+import inquisitor
+import inquisitor.assets.host
+import inquisitor.report
+import inquisitor.storage
+import json
+import logging
+import os
+import platform
+import random
+import shutil
+import sys
+import tabulate
+import tempfile
+import time
+
+SIZES = [1000, 10000, 100000]
+# Number of assets sampled by the operations working on single assets
+SAMPLE = 1000
+# Slowdown beyond which an operation counts as a regression
+TOLERANCE = 0.25
+
+def load_script():
+    # The inq script has no extension, so it is executed from its source,
+    # with its logs left out of the results
+    path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'inq')
+    script = dict(__name__='inq_script', __file__=path)
+    with open(path) as handle:
+        exec compile(handle.read(), path, 'exec') in script
+    script['logger'].setLevel(logging.WARNING)
+    return script
+
+def populate(repository, profile, size):
+    def run():
+        repository.put_assets_bulk(
+            benchmarks.synthetic.PROFILES[profile](size)
+        )
+        return size
+    return run
+
+def get_asset_string(repository, sample):
+    def run():
+        for asset_type, identifier in sample:
+            assert repository.get_asset_string(asset_type, identifier)
+        return len(sample)
+    return run
+
+def put_asset_object(repository, sample):
+    # New hosts below the sampled ones
+    assets = [
+        inquisitor.assets.host.Host('new{}.{}'.format(index, identifier))
+        for index, (asset_type, identifier) in enumerate(sample)
+        if asset_type is inquisitor.assets.host.Host
+    ]
+    def run():
+        for asset in assets:
+            repository.put_asset_object(asset)
+        return len(assets)
+    return run
+
+def get_assets(repository, sample):
+    def run():
+        return len(repository.get_assets(lambda obj, data: True))
+    return run
+
+def is_owned(repository, sample):
+    assets = [
+        repository.get_asset_string(asset_type, identifier)[1]
+        for asset_type, identifier in sample
+    ]
+    def run():
+        for asset in assets:
+            asset.is_owned(repository)
+        return len(assets)
+    return run
+
+def parent_asset(repository, sample):
+    assets = [
+        repository.get_asset_string(asset_type, identifier)[1]
+        for asset_type, identifier in sample
+    ]
+    def run():
+        for asset in assets:
+            asset.parent_asset(repository)
+        return len(assets)
+    return run
+
+def status(repository, sample):
+    # Counts every asset again like the first status of a database does
+    for asset_module in inquisitor.ASSET_MODULES:
+        key = repository.counts_key(asset_module)
+        if repository.database.exists(key):
+            del repository.database[key]
+    inq = load_script()
+    def run():
+        # The table is printed to the standard output
+        stdout = sys.stdout
+        with open(os.devnull, 'w') as sys.stdout:
+            try:
+                inq['status'](repository, False)
+            finally:
+                sys.stdout = stdout
+        return len(inquisitor.ASSET_MODULES)
+    return run
+
+def dump(repository, sample):
+    inq = load_script()
+    count = sum(
+        repository.database.count(asset_module.REPOSITORY)
+        for asset_module in inquisitor.ASSET_MODULES
+    )
+    def run():
+        inq['dump_ndjson'](repository, os.devnull, True)
+        return count
+    return run
+
+def visualize(repository, sample):
+    def run():
+        tree = inquisitor.report.build_tree(repository)
+        json.dumps(tree)
+        return 1
+    return run
+
+# Operations timed against every database, along with whether they write
+OPERATIONS = [
+    (get_asset_string, False),
+    (put_asset_object, True),
+    (get_assets, False),
+    (is_owned, False),
+    (parent_asset, False),
+    (status, True),
+    (dump, False),
+    (visualize, False),
+]
+
+def measure(path, backend, prepare):
+    # Runs the prepared operation in a child process opening the database
+    # on its own, so that the peak memory it reports is that of the
+    # operation alone, returning the (count, seconds, peak megabytes) of it
+    read, write = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read)
+        status = 1
+        try:
+            repository = inquisitor.IntelligenceRepository(path, backend)
+            run = prepare(repository)
+            start = time.time()
+            count = run()
+            elapsed = time.time() - start
+            repository.database.close()
+            os.write(write, json.dumps([count, elapsed]))
+            status = 0
+        finally:
+            os._exit(status)
+    os.close(write)
+    output = ''
+    while True:
+        chunk = os.read(read, 4096)
+        if not chunk:
+            break
+        output += chunk
+    os.close(read)
+    __pid, status, usage = os.wait4(pid, 0)
+    if status:
+        raise RuntimeError('Benchmark process failed')
+    count, elapsed = json.loads(output)
+    # The peak resident set size is reported in bytes by macOS and in
+    # kilobytes by Linux
+    unit = 1024.0 * 1024.0 if sys.platform == 'darwin' else 1024.0
+    return (count, elapsed, usage.ru_maxrss / unit)
+
+def result(profile, size, operation, count, elapsed, peak):
+    return {
+        'profile': profile,
+        'size': size,
+        'operation': operation,
+        'count': count,
+        'seconds': round(elapsed, 6),
+        'per_second': round(count / elapsed, 3) if elapsed else None,
+        'milliseconds_each': (
+            round(elapsed * 1000 / count, 6) if count else None
+        ),
+        'peak_megabytes': round(peak, 3),
+    }
+
+def run(directory, backend, profile, size):
+    path = os.path.join(directory, '{}-{}{}'.format(
+        profile,
+        size,
+        '.sqlite' if backend == 'sqlite' else '.db',
+    ))
+    results = list()
+    count, elapsed, peak = measure(
+        path,
+        backend,
+        lambda repository: populate(repository, profile, size),
+    )
+    results.append(result(profile, size, 'populate', count, elapsed, peak))
+    identifiers = [
+        (type(asset), getattr(asset, sys.modules[
+            type(asset).__module__
+        ].OBJECT_ID))
+        for asset in benchmarks.synthetic.PROFILES[profile](size)
+    ]
+    sample = random.Random(size).sample(
+        identifiers,
+        min(SAMPLE, len(identifiers)),
+    )
+    for operation, writes in OPERATIONS:
+        # Writing operations work on a copy of the database of their own
+        target = path
+        if writes:
+            target = os.path.join(directory, 'copy-{}'.format(
+                os.path.basename(path)
+            ))
+            shutil.copyfile(path, target)
+        count, elapsed, peak = measure(
+            target,
+            backend,
+            lambda repository: operation(repository, sample),
+        )
+        results.append(
+            result(profile, size, operation.__name__, count, elapsed, peak)
+        )
+        if writes:
+            os.remove(target)
+    return results
+
+def compare(results, baseline, tolerance):
+    # Returns the operations slower than in the baseline beyond the tolerance.
+    # Baselines saved before there were profiles only hold the spread one.
+    key = lambda entry: (
+        entry.get('profile', 'spread'),
+        entry['size'],
+        entry['operation'],
+    )
+    previous = dict((key(entry), entry) for entry in baseline['results'])
+    regressions = list()
+    for entry in results:
+        before = previous.get(key(entry))
+        if not before or not before['per_second'] or not entry['per_second']:
+            continue
+        ratio = entry['per_second'] / before['per_second']
+        if ratio < 1 - tolerance:
+            regressions.append([
+                entry['profile'],
+                entry['size'],
+                entry['operation'],
+                before['per_second'],
+                entry['per_second'],
+                '{:.2f}'.format(ratio),
+            ])
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=(
+            'Times repository operations against synthetic databases of '
+            'the specified sizes.'
+        ),
+    )
+    parser.add_argument(
+        'sizes',
+        metavar='SIZE',
+        type=int,
+        nargs='*',
+        help='The number of assets of each database.',
+        default=SIZES,
+    )
+    parser.add_argument(
+        '--profile',
+        choices=sorted(benchmarks.synthetic.PROFILES),
+        nargs='+',
+        help=(
+            'The shapes of the databases, either spread over many '
+            'registrants and zones or with every host in a single one.'
+        ),
+        dest='profiles',
+        default=sorted(benchmarks.synthetic.PROFILES),
+    )
+    parser.add_argument(
+        '--backend',
+        choices=sorted(inquisitor.storage.BACKENDS),
+        default='unqlite',
+    )
+    parser.add_argument(
+        '-o', '--output',
+        metavar='FILE',
+        help='Writes the results to the file as JSON.',
+    )
+    parser.add_argument(
+        '--baseline',
+        metavar='FILE',
+        help=(
+            'Compares the results with those of an earlier run, failing if '
+            'any operation became slower beyond the tolerance.'
+        ),
+    )
+    parser.add_argument(
+        '--tolerance',
+        metavar='RATIO',
+        type=float,
+        default=TOLERANCE,
+    )
+    args = parser.parse_args()
+    directory = tempfile.mkdtemp()
+    results = list()
+    try:
+        for profile in args.profiles:
+            for size in args.sizes:
+                results.extend(run(directory, args.backend, profile, size))
+    finally:
+        shutil.rmtree(directory)
+    report = {
+        'python': platform.python_version(),
+        'backend': args.backend,
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as handle:
+            json.dump(report, handle, indent=4, sort_keys=True)
+    # A flat cost per asset as the databases grow means an operation scales
+    # linearly
+    table = [[
+        'Profile', 'Assets', 'Operation', 'Count', 'Seconds', 'Per Second',
+        'Ms Each', 'Peak MB',
+    ]]
+    for entry in results:
+        table.append([
+            entry['profile'],
+            entry['size'],
+            entry['operation'],
+            entry['count'],
+            '{:.3f}'.format(entry['seconds']),
+            '{:.1f}'.format(entry['per_second'] or 0),
+            '{:.3f}'.format(entry['milliseconds_each'] or 0),
+            '{:.1f}'.format(entry['peak_megabytes']),
+        ])
+    print tabulate.tabulate(table, headers='firstrow')
+    if args.baseline:
+        with open(args.baseline) as handle:
+            regressions = compare(results, json.load(handle), args.tolerance)
+        if regressions:
+            print
+            print tabulate.tabulate(
+                [[
+                    'Profile', 'Assets', 'Operation', 'Before', 'After',
+                    'Ratio',
+                ]] +
+                regressions,
+                headers='firstrow',
+            )
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
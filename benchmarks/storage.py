@@ -0,0 +1,90 @@
+import benchmarks.synthetic
+import inquisitor
+import inquisitor.storage
+import os
+import random
+import shutil
+import sys
+import tabulate
+import tempfile
+import time
+
+SIZES = [100000, 1000000]
+BATCH_SIZE = 1000
+LOOKUPS = 10000
+
+def load(repository, size):
+    # Writes the records and index entries of the assets directly, leaving
+    # out the ownership bookkeeping every backend shares
+    identifiers = list()
+    assets = benchmarks.synthetic.generate(size)
+    done = False
+    while not done:
+        with repository.transaction():
+            for index in range(BATCH_SIZE):
+                asset = next(assets, None)
+                if asset is None:
+                    done = True
+                    break
+                module = sys.modules[asset.__class__.__module__]
+                identifier = getattr(asset, module.OBJECT_ID)
+                asset.effective_owned = bool(asset.owned)
+                __id = repository.write_asset(None, asset)
+                repository.index_store(module, identifier, __id)
+                identifiers.append((asset.__class__, identifier))
+    return identifiers
+
+def measure(function):
+    start = time.time()
+    result = function()
+    return (time.time() - start, result)
+
+def run(directory, backend, size):
+    path = os.path.join(directory, '{}-{}'.format(backend, size))
+    repository = inquisitor.IntelligenceRepository(path, backend)
+    store, identifiers = measure(lambda: load(repository, size))
+    repository.database.close()
+    repository = inquisitor.IntelligenceRepository(path, backend)
+    sample = random.Random(size).sample(identifiers, LOOKUPS)
+    lookup, found = measure(lambda: sum(
+        1 for asset_type, identifier in sample
+        if repository.get_asset_string(asset_type, identifier)
+    ))
+    assert found == LOOKUPS
+    owned, count = measure(lambda: sum(1 for asset in repository.iter_assets(
+        match={'effective_owned': True},
+    )))
+    repository.database.close()
+    megabytes = os.path.getsize(path) / 1024.0 / 1024.0
+    return [
+        backend,
+        len(identifiers),
+        '{:.1f}'.format(len(identifiers) / store),
+        '{:.1f}'.format(lookup * 1000000 / LOOKUPS),
+        '{:.3f}'.format(owned),
+        count,
+        '{:.1f}'.format(megabytes),
+    ]
+
+def main():
+    sizes = [int(size) for size in sys.argv[1:]] or SIZES
+    directory = tempfile.mkdtemp()
+    table = [[
+        'Backend',
+        'Assets',
+        'Stores/Second',
+        'Microseconds/Lookup',
+        'Owned Scan Seconds',
+        'Owned',
+        'Megabytes',
+    ]]
+    try:
+        for size in sizes:
+            for backend in sorted(inquisitor.storage.BACKENDS):
+                table.append(run(directory, backend, size))
+    finally:
+        shutil.rmtree(directory)
+    print tabulate.tabulate(table, headers='firstrow')
+
+if __name__ == '__main__':
+    main()
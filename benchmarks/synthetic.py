@@ -0,0 +1,116 @@
+import inquisitor
+import inquisitor.assets
+import inquisitor.assets.block
+import inquisitor.assets.email
+import inquisitor.assets.host
+import inquisitor.assets.linkedin
+import inquisitor.assets.registrant
+import sys
+
+def make(asset_type, identifier, owned=None, **fields):
+    # Build an asset without performing any network lookups
+    asset = asset_type.__new__(asset_type)
+    inquisitor.assets.Asset.__init__(asset, owned=owned)
+    module = sys.modules[asset_type.__module__]
+    setattr(asset, module.OBJECT_ID, identifier)
+    for name, value in fields.iteritems():
+        setattr(asset, name, value)
+    asset.enriched = True
+    return asset
+
+def host(name, parent=None, ip=None, registrant=None, blocks=None):
+    return make(
+        inquisitor.assets.host.Host,
+        name,
+        parent=parent,
+        ip=ip,
+        addresses=[ip] if ip else list(),
+        registrant=registrant,
+        emails=list(),
+        nameservers=list(),
+        blocks=blocks or list(),
+    )
+
+def generate(size):
+    # Yields about size assets in dependency order so that storing them
+    # never has to create related assets on the fly. Every registrant owns a
+    # block and a domain whose zones hold hosts within the block, along with
+    # email addresses and LinkedIn accounts of its employees. Half of the
+    # registrants belong to the target.
+    registrants = max(1, size / 100)
+    per_registrant = max(1, size / registrants)
+    zones = max(1, per_registrant / 25)
+    emails = max(1, per_registrant / 5)
+    linkedins = max(1, per_registrant / 8)
+    hosts = max(1, per_registrant - 3 - zones - emails - linkedins)
+    for r in range(registrants):
+        name = 'REGISTRANT {}'.format(r)
+        domain = 'registrant{}.com'.format(r)
+        network = '10.{}.{}'.format(r / 256, r % 256)
+        block = '{}.0/24'.format(network)
+        yield make(
+            inquisitor.assets.registrant.Registrant,
+            name,
+            owned=(r % 2 == 0),
+        )
+        yield make(
+            inquisitor.assets.block.Block,
+            block,
+            registrant=name,
+        )
+        yield host(domain, registrant=name)
+        for z in range(zones):
+            yield host('zone{}.{}'.format(z, domain), parent=domain)
+        for h in range(hosts):
+            yield host(
+                'h{}.zone{}.{}'.format(h, h % zones, domain),
+                parent='zone{}.{}'.format(h % zones, domain),
+                ip='{}.{}'.format(network, h % 256),
+                blocks=[block],
+            )
+        for e in range(emails):
+            yield make(
+                inquisitor.assets.email.Email,
+                'user{}@{}'.format(e, domain),
+                recipient='user{}'.format(e),
+                domain=domain,
+            )
+        for l in range(linkedins):
+            username = 'employee-{}-{}'.format(r, l)
+            yield make(
+                inquisitor.assets.linkedin.LinkedIn,
+                'https://www.linkedin.com/in/{}'.format(username),
+                username=username,
+                corporation=name,
+            )
+
+def generate_wide(size):
+    # Yields about size assets in dependency order, all but three of them
+    # being hosts of a single registrant within a single zone, which gives
+    # the zone and the registrant as many dependents as there are assets
+    name = 'REGISTRANT 0'
+    domain = 'registrant0.com'
+    zone = 'zone.{}'.format(domain)
+    yield make(inquisitor.assets.registrant.Registrant, name, owned=True)
+    yield host(domain, registrant=name)
+    yield host(zone, parent=domain)
+    for h in range(max(1, size - 3)):
+        yield host(
+            'h{}.{}'.format(h, zone),
+            parent=zone,
+            ip='10.{}.{}.{}'.format(h / 65536 % 256, h / 256 % 256, h % 256),
+            registrant=name,
+        )
+
+# Shapes of the synthetic databases by name
+PROFILES = {
+    'spread': generate,
+    'wide': generate_wide,
+}
+
+def populate(repository, size, profile='spread'):
+    count = 0
+    for asset in PROFILES[profile](size):
+        repository.put_asset_object(asset)
+        count += 1
+    return count
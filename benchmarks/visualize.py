@@ -0,0 +1,41 @@
+import benchmarks.synthetic
+import inquisitor
+import inquisitor.report
+import os
+import shutil
+import tabulate
+import tempfile
+import time
+
+SIZES = [1000, 2000, 4000, 8000]
+
+def main():
+    directory = tempfile.mkdtemp()
+    table = [['Assets', 'Owned', 'Seconds', 'Microseconds/Asset']]
+    try:
+        for size in SIZES:
+            repository = inquisitor.IntelligenceRepository(
+                os.path.join(directory, '{}.db'.format(size))
+            )
+            count = benchmarks.synthetic.populate(repository, size)
+            owned = sum(1 for data in repository.iter_assets(
+                match={'effective_owned': True},
+                raw=True,
+            ))
+            start = time.time()
+            inquisitor.report.build_tree(repository)
+            elapsed = time.time() - start
+            table.append([
+                count,
+                owned,
+                '{:.3f}'.format(elapsed),
+                '{:.1f}'.format(elapsed * 1000000 / count),
+            ])
+            repository.database.close()
+    finally:
+        shutil.rmtree(directory)
+    # A flat cost per asset means the builder scales linearly
+    print tabulate.tabulate(table, headers='firstrow')
+
+if __name__ == '__main__':
+    main()
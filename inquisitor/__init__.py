@@ -1,10 +1,19 @@
+import collections
+import contextlib
 import inquisitor.assets.block
 import inquisitor.assets.email
 import inquisitor.assets.host
 import inquisitor.assets.linkedin
 import inquisitor.assets.registrant
+import inquisitor.enrichment
+import inquisitor.netblocks
+import inquisitor.profiling
+import inquisitor.records
+import inquisitor.storage
+import json
+import logging
 import sys
-import unqlite
+import threading
 
 ASSET_MODULES = [
     inquisitor.assets.registrant,
@@ -14,36 +23,510 @@ ASSET_MODULES = [
     inquisitor.assets.linkedin,
 ]
 
+# Columns holding the identifiers of the assets which the assets of the
+# first module depend on, by the module of those assets
+DEPENDENCY_COLUMNS = {
+    (inquisitor.assets.host, inquisitor.assets.host): 'parent',
+    (inquisitor.assets.host, inquisitor.assets.registrant): 'registrant',
+    (inquisitor.assets.block, inquisitor.assets.registrant): 'registrant',
+}
+
+INDEX_VERSION = '3'
+INDEX_VERSION_KEY = 'index'
+RECORDS_VERSION_KEY = 'records'
+DEPENDENTS_PREFIX = 'dependents:'
+PENDING_PREFIX = 'pending:'
+OWNED_PREFIX = 'owned:'
+COUNTS_PREFIX = 'counts:'
+REVISION_KEY = 'revision'
+JOURNAL_KEY = 'journal'
+JOURNAL_PREFIX = 'journal:'
+
 class IntelligenceRepository:
 
-    def __init__(self, path):
-        self.database = unqlite.UnQLite(path)
-        self.repositories = dict()
+    def __init__(self, path, backend=None):
+        self.path = path
+        self.database = inquisitor.storage.connect(path, backend)
+        # Serializes access to the database across scan worker threads
+        self.lock = threading.RLock()
+        for asset_module in ASSET_MODULES:
+            self.database.create(asset_module.REPOSITORY)
+        # Owned netblocks are indexed lazily on first use
+        self.netblocks = None
+        # Assets which become owned are only recorded while being watched
+        self.watching = False
+        # Convert records stored in an older layout
+        records_version = str(inquisitor.records.VERSION)
+        if not (
+            self.database.exists(RECORDS_VERSION_KEY) and
+            self.database[RECORDS_VERSION_KEY] == records_version
+        ):
+            self.migrate_records()
+            self.database[RECORDS_VERSION_KEY] = records_version
+        # Initialize the identifier index
+        self.indexed = (
+            self.database.exists(INDEX_VERSION_KEY) and
+            self.database[INDEX_VERSION_KEY] == INDEX_VERSION
+        )
+        if not self.indexed:
+            if not any(
+                self.database.count(m.REPOSITORY) for m in ASSET_MODULES
+            ):
+                # Fresh databases are indexed from the start
+                self.database[INDEX_VERSION_KEY] = INDEX_VERSION
+                self.indexed = True
+            else:
+                logging.warning(
+                    'Lookup indexes not found or outdated. Lookups will be '
+                    'slow and ownership may be inaccurate until the '
+                    '"reindex" command is run on this database.'
+                )
+
+    def migrate_records(self):
+        # Re-encodes every record stored in an older layout in one
+        # transaction, keeping the record ids used by the index
+        with self.transaction():
+            migrated = 0
+            for asset_module in ASSET_MODULES:
+                asset_type = asset_module.ASSET_CLASS
+                for __id, record in list(
+                    self.database.records(asset_module.REPOSITORY)
+                ):
+                    if not isinstance(record, dict):
+                        continue
+                    asset = self.load_asset(
+                        asset_type,
+                        inquisitor.records.decode(asset_type, record),
+                    )
+                    self.write_asset(__id, asset)
+                    migrated += 1
+        if migrated:
+            logging.info('Asset records migrated: {}'.format(migrated))
+
+    def asset_key(self, prefix, module, identifier):
+        if isinstance(identifier, str):
+            identifier = identifier.decode('utf-8')
+        key = u'{}{}:{}'.format(prefix, module.REPOSITORY, identifier)
+        return key.encode('utf-8')
+
+    def index_store(self, module, identifier, __id):
+        self.database.index(module.REPOSITORY, identifier, __id)
+
+    def write_asset(self, __id, asset):
+        # Stores the asset in the record with the id, or in a new record if
+        # there is none, returning the id of the record
+        asset_type = asset.__class__
+        module = sys.modules[asset_type.__module__]
+        record = inquisitor.records.encode(asset)
+        columns = inquisitor.records.columns(
+            asset_type,
+            inquisitor.records.data(asset),
+        )
+        if __id is None:
+            return self.database.store(module.REPOSITORY, record, columns)
+        self.database.update(module.REPOSITORY, __id, record, columns)
+        return __id
+
+    def dependents_key(self, module, identifier, *parts):
+        # The dependents of an asset are counted under its key and listed
+        # under its key followed by their position, and whether an asset is
+        # listed is kept under its key followed by the dependent. Identifiers
+        # may contain any character so the parts are kept apart as JSON.
+        return DEPENDENTS_PREFIX + json.dumps(
+            [module.REPOSITORY, identifier] + list(parts)
+        )
+
+    def dependents_get(self, module, identifier):
+        # Returns the module names and identifiers of the assets depending
+        # on the asset
+        dependents = set()
+        key = self.dependents_key(module, identifier)
+        if self.database.exists(key):
+            for position in range(int(self.database[key])):
+                entry = self.database[
+                    self.dependents_key(module, identifier, position)
+                ]
+                dependents.add(tuple(json.loads(entry)))
+        # Dependents found through the indexed columns are not listed
+        for modules, column in DEPENDENCY_COLUMNS.iteritems():
+            dependent_module, dependency_module = modules
+            if dependency_module is not module:
+                continue
+            if column not in self.database.LOOKUP_COLUMNS:
+                continue
+            dependents.update(
+                (dependent_module.__name__, dependent)
+                for dependent in self.database.identifiers(
+                    dependent_module.REPOSITORY,
+                    column,
+                    identifier,
+                )
+            )
+        return sorted(dependents)
+
+    def dependents_store(self, asset):
+        # Register the asset as a dependent of the assets it depends on, in
+        # constant time however many dependents they already have
+        module_name = asset.__class__.__module__
+        module = sys.modules[module_name]
+        entry = [module_name, getattr(asset, module.OBJECT_ID)]
+        for dependency_type, identifier in asset.ownership_dependencies():
+            dependency_module = sys.modules[dependency_type.__module__]
+            column = DEPENDENCY_COLUMNS.get((module, dependency_module))
+            if (
+                column in self.database.LOOKUP_COLUMNS and
+                getattr(asset, column) == identifier
+            ):
+                continue
+            key = self.dependents_key(dependency_module, identifier, *entry)
+            if self.database.exists(key):
+                continue
+            count_key = self.dependents_key(dependency_module, identifier)
+            count = 0
+            if self.database.exists(count_key):
+                count = int(self.database[count_key])
+            position_key = self.dependents_key(
+                dependency_module,
+                identifier,
+                count,
+            )
+            self.database[position_key] = json.dumps(entry)
+            self.database[count_key] = str(count + 1)
+            self.database[key] = str(count)
+
+    def propagate_ownership(self, asset):
+        # Push the ownership of the asset to the assets depending on it
+        module = sys.modules[asset.__class__.__module__]
+        pending = [(module, getattr(asset, module.OBJECT_ID))]
+        while pending:
+            module, identifier = pending.pop()
+            for module_name, dependent in self.dependents_get(module, identifier):
+                dependent_module = sys.modules[module_name]
+                result = self.get_asset_string(
+                    dependent_module.ASSET_CLASS,
+                    dependent,
+                )
+                if not result:
+                    continue
+                __id, obj = result
+                owned = obj.is_owned(self)
+                if owned == obj.effective_owned:
+                    continue
+                self.counts_update(
+                    dependent_module,
+                    (obj.owned, obj.effective_owned),
+                    (obj.owned, owned),
+                )
+                obj.effective_owned = owned
+                obj.revision = self.next_revision()
+                self.write_asset(__id, obj)
+                self.netblocks_update(obj)
+                self.ownership_changed(obj)
+                pending.append((dependent_module, dependent))
+
+    def ownership_changed(self, asset):
+        if asset.effective_owned and self.watching:
+            module = sys.modules[asset.__class__.__module__]
+            key = self.asset_key(
+                OWNED_PREFIX,
+                module,
+                getattr(asset, module.OBJECT_ID),
+            )
+            self.database[key] = module.__name__
+
+    def watch_ownership(self, resume=False):
+        # Starts recording the assets which become owned, keeping the ones
+        # recorded by an interrupted scan if resuming
+        with self.lock:
+            self.watching = True
+            if not resume:
+                for key, value in list(self.database.match_prefix(OWNED_PREFIX)):
+                    del self.database[key]
+
+    def pop_newly_owned(self):
+        # Returns the assets which became owned since the last call and are
+        # still owned
+        with self.lock:
+            keys = list(self.database.match_prefix(OWNED_PREFIX))
+            for key, module_name in keys:
+                del self.database[key]
+        assets = list()
+        for key, module_name in sorted(keys):
+            module = sys.modules[module_name]
+            identifier = key[len(OWNED_PREFIX) + len(module.REPOSITORY) + 1:]
+            result = self.get_asset_string(module.ASSET_CLASS, identifier)
+            if result and result[1].effective_owned:
+                assets.append(result[1])
+        return assets
+
+    def journal_get(self):
+        # Returns the last recorded round of an unfinished scan, if any
+        with self.lock:
+            if not self.database.exists(JOURNAL_KEY):
+                return None
+            return json.loads(self.database[JOURNAL_KEY])
+
+    def journal_round(self, depth, frontier):
+        # Records the (module name, identifier) pairs of the assets to be
+        # transformed in the current round of a scan
+        with self.lock:
+            self.database[JOURNAL_KEY] = json.dumps({
+                'depth': depth,
+                'frontier': [list(key) for key in frontier],
+            })
+            # Progress must survive the scan being killed
+            self.database.commit()
+
+    def journal_done(self, asset, sources):
+        # Records that the asset and its transform results were stored
+        module = sys.modules[asset.__class__.__module__]
+        identifier = getattr(asset, module.OBJECT_ID)
+        with self.lock:
+            key = self.asset_key(JOURNAL_PREFIX, module, identifier)
+            self.database[key] = json.dumps(
+                [module.__name__, identifier, sorted(sources)]
+            )
+            # Along with the asset, which was stored before
+            self.database.commit()
+
+    def journal_transformed(self, sources):
+        # Returns the assets already transformed with all of the sources
+        with self.lock:
+            entries = list(self.database.match_prefix(JOURNAL_PREFIX))
+        transformed = set()
+        for key, value in entries:
+            module_name, identifier, done = json.loads(value)
+            if set(sources).issubset(done):
+                transformed.add((module_name, identifier))
+        return transformed
+
+    def journal_clear(self):
+        # Forgets the progress of the last scan
+        with self.lock:
+            self.watching = False
+            for prefix in [JOURNAL_PREFIX, OWNED_PREFIX]:
+                for key, value in list(self.database.match_prefix(prefix)):
+                    del self.database[key]
+            if self.database.exists(JOURNAL_KEY):
+                del self.database[JOURNAL_KEY]
+
+    def get_revision(self):
+        # Returns the revision of the most recently stored or changed asset
+        with self.lock:
+            if not self.database.exists(REVISION_KEY):
+                return 0
+            return int(self.database[REVISION_KEY])
+
+    def next_revision(self):
+        with self.lock:
+            revision = self.get_revision() + 1
+            self.database[REVISION_KEY] = str(revision)
+        return revision
+
+    def counts_key(self, module):
+        return '{}{}'.format(COUNTS_PREFIX, module.REPOSITORY)
+
+    def counts_update(self, module, previous, current):
+        # Moves an asset between the (strong, effective) ownership counters
+        # of its type, where None stands for the asset not being stored.
+        # Counters are only maintained once they have been counted.
+        key = self.counts_key(module)
+        if not self.database.exists(key):
+            return
+        counts = json.loads(self.database[key])
+        for state, delta in [(previous, -1), (current, 1)]:
+            if state is not None:
+                owned, effective = state
+                counts['owned'][json.dumps(owned)] += delta
+                counts['effective'][json.dumps(bool(effective))] += delta
+        self.database[key] = json.dumps(counts)
+
+    def get_counts(self, asset_type):
+        # Returns the number of stored assets of the type by strong and by
+        # effective ownership, counting them once if not yet maintained
+        module = sys.modules[asset_type.__module__]
+        key = self.counts_key(module)
+        with self.lock:
+            if not self.database.exists(key):
+                counts = {
+                    'owned': {'true': 0, 'null': 0, 'false': 0},
+                    'effective': {'true': 0, 'false': 0},
+                }
+                for data in self.iter_assets(asset_type, raw=True):
+                    counts['owned'][json.dumps(data.get('owned'))] += 1
+                    effective = bool(data.get('effective_owned'))
+                    counts['effective'][json.dumps(effective)] += 1
+                self.database[key] = json.dumps(counts)
+            counts = json.loads(self.database[key])
+        return dict(
+            (kind, dict(
+                (json.loads(owned), count)
+                for owned, count in counts[kind].iteritems()
+            ))
+            for kind in counts
+        )
+
+    def netblocks_build(self):
+        self.netblocks = inquisitor.netblocks.PrefixTable()
+        for data in self.iter_assets(
+            inquisitor.assets.block.Block,
+            match={'effective_owned': True},
+            raw=True,
+        ):
+            block = data[inquisitor.assets.block.OBJECT_ID]
+            self.netblocks.add(block, block)
+
+    def netblocks_update(self, asset):
+        # Keep the owned netblock index current once it has been built
+        if self.netblocks is None:
+            return
+        if not isinstance(asset, inquisitor.assets.block.Block):
+            return
+        if asset.effective_owned:
+            self.netblocks.add(asset.block, asset.block)
+        else:
+            self.netblocks.remove(asset.block)
+
+    def get_owned_block(self, network, strict=False):
+        # Returns the smallest owned netblock containing the IP or CIDR
+        with self.lock:
+            if self.netblocks is None:
+                self.netblocks_build()
+            match = self.netblocks.longest_match(network, strict=strict)
+        if not match:
+            return None
+        result = self.get_asset_string(inquisitor.assets.block.Block, match[1])
+        return result[1] if result else None
+
+    def pending_update(self, asset):
+        # Track the assets that still need to be enriched
+        module = sys.modules[asset.__class__.__module__]
+        key = self.asset_key(
+            PENDING_PREFIX,
+            module,
+            getattr(asset, module.OBJECT_ID),
+        )
+        if not asset.enriched:
+            self.database[key] = module.__name__
+        elif self.database.exists(key):
+            del self.database[key]
+
+    def get_pending_assets(self, limit=None):
+        results = list()
+        with self.lock:
+            pending = list(self.database.match_prefix(PENDING_PREFIX))
+        for key, module_name in pending:
+            module = sys.modules[module_name]
+            identifier = key[len(PENDING_PREFIX) + len(module.REPOSITORY) + 1:]
+            result = self.get_asset_string(module.ASSET_CLASS, identifier)
+            if result and not result[1].enriched:
+                results.append(result[1])
+            else:
+                # Keys left behind by assets removed or enriched since
+                with self.lock:
+                    del self.database[key]
+            if limit and len(results) >= limit:
+                break
+        return results
+
+    @inquisitor.profiling.timed('repository.enrich_pending')
+    def enrich_pending(self, batch_size=1000):
+        # Enrich stored assets in batches until none are left. Storing an
+        # enriched asset may store new related assets needing enrichment.
+        enriched = 0
+        while True:
+            pending = self.get_pending_assets(limit=batch_size)
+            if not pending:
+                break
+            pending = inquisitor.enrichment.enrich(pending)
+            # Batches which enrich nothing would be fetched again forever
+            if not pending:
+                break
+            self.put_assets_bulk(pending, overwrite=True)
+            enriched += len(pending)
+        return enriched
+
+    def rebuild_index(self):
+        # Remove all existing index entries, recounting assets lazily
+        self.database.drop_index()
+        for prefix in [DEPENDENTS_PREFIX, COUNTS_PREFIX]:
+            stale = [key for key, value in self.database.match_prefix(prefix)]
+            for key in stale:
+                del self.database[key]
+        # Index every stored asset
         for asset_module in ASSET_MODULES:
-            identifier = asset_module.REPOSITORY
-            repository = self.database.collection(identifier)
-            repository.create()
-            self.repositories[identifier] = repository
+            for __id, asset in self.load_records(asset_module):
+                self.index_store(
+                    asset_module,
+                    getattr(asset, asset_module.OBJECT_ID),
+                    __id,
+                )
+                asset.effective_owned = False
+                asset.revision = self.next_revision()
+                self.write_asset(__id, asset)
+                self.dependents_store(asset)
+        self.database[INDEX_VERSION_KEY] = INDEX_VERSION
+        self.indexed = True
+        self.netblocks = None
+        # Recompute ownership until no asset changes anymore
+        changed = True
+        while changed:
+            changed = False
+            for asset_module in ASSET_MODULES:
+                for __id, asset in self.load_records(asset_module):
+                    owned = asset.is_owned(self)
+                    if owned != asset.effective_owned:
+                        asset.effective_owned = owned
+                        asset.revision = self.next_revision()
+                        self.write_asset(__id, asset)
+                        changed = True
+
+    def load_records(self, asset_module):
+        # Returns the ids and objects of every stored asset of the module
+        asset_type = asset_module.ASSET_CLASS
+        return [
+            (__id, self.load_asset(
+                asset_type,
+                inquisitor.records.decode(asset_type, record),
+            ))
+            for __id, record in self.database.records(asset_module.REPOSITORY)
+        ]
 
+    @inquisitor.profiling.timed('repository.get_asset_data')
     def get_asset_data(self, asset):
+        # Returns the record id and the decoded fields of the stored asset
         module = sys.modules[asset.__class__.__module__]
-        repository = self.repositories[module.REPOSITORY]
+        asset_type = asset.__class__
         identifier = module.OBJECT_ID
         query = getattr(asset, identifier)
-        results = repository.filter(lambda a: a['data'][identifier] == query)
-        return results[0] if results else None
+        with self.lock:
+            # Fall back to a full scan if the database has not been indexed
+            if not self.indexed:
+                for __id, record in self.database.records(module.REPOSITORY):
+                    data = inquisitor.records.decode(asset_type, record)
+                    if data[identifier] == query:
+                        return {'__id': __id, 'data': data}
+                return None
+            # Acquire the record identifier from the index
+            __id = self.database.lookup(module.REPOSITORY, query)
+            if __id is None:
+                return None
+            record = self.database.fetch(module.REPOSITORY, __id)
+        if record is None:
+            return None
+        data = inquisitor.records.decode(asset_type, record)
+        if data[identifier] != query:
+            return None
+        return {'__id': __id, 'data': data}
+
+    def load_asset(self, asset_type, data):
+        return inquisitor.records.load(asset_type, data)
 
     def get_asset_object(self, asset, create=False, store=False):
         result = self.get_asset_data(asset)
         asset_type = asset.__class__
         if result:
-            __id = result['__id']
-            data = result['data']
-            obj = asset_type.__new__(asset_type)
-            for name, value in data.iteritems():
-                setattr(obj, name, value)
-            obj.transforms = dict(obj.transforms)
-            return (__id, obj)
+            return (result['__id'], self.load_asset(asset_type, result['data']))
         elif create:
             asset_module = sys.modules[asset_type.__module__]
             asset = asset_type(getattr(asset, asset_module.OBJECT_ID))
@@ -65,40 +548,140 @@ class IntelligenceRepository:
         setattr(query, module.OBJECT_ID, identifier)
         return self.get_asset_object(query, create=create, store=store)
 
+    def iter_assets(self, asset_type=None, where=None, raw=False, match=None):
+        # Yields the stored assets of the provided type, or of every type, one
+        # at a time. Records rejected by the predicate over their stored data
+        # are skipped without being loaded, and the stored data is yielded
+        # instead of asset objects if raw is set. Assets may also be matched
+        # on the values of their indexable columns, which storage backends
+        # with indexes do without reading the other records.
+        match = match or dict()
+        for asset_module in ASSET_MODULES:
+            asset_class = asset_module.ASSET_CLASS
+            if asset_type and asset_class is not asset_type:
+                continue
+            records = self.database.records(asset_module.REPOSITORY, match)
+            while True:
+                with self.lock:
+                    result = next(records, None)
+                if result is None:
+                    break
+                data = inquisitor.records.decode(asset_class, result[1])
+                columns = inquisitor.records.columns(asset_class, data)
+                if any(
+                    columns[column] != value
+                    for column, value in match.iteritems()
+                ):
+                    continue
+                if where and not where(data):
+                    continue
+                yield data if raw else self.load_asset(asset_class, data)
+
     def get_assets(self, include, limit=None):
         results = set()
         for asset_module in ASSET_MODULES:
-            asset_class = asset_module.ASSET_CLASS
-            repository = self.repositories[asset_module.REPOSITORY]
-            index = 0
-            for data in repository.all():
-                data = data['data']
-                obj = asset_class.__new__(asset_class)
-                for name, value in data.iteritems():
-                    setattr(obj, name, value)
-                obj.transforms = dict(obj.transforms)
-                if include(obj, data):
-                    results.add(obj)
-                index += 1
+            assets = self.iter_assets(asset_module.ASSET_CLASS)
+            for index, obj in enumerate(assets):
                 if limit and index >= limit:
                     break
+                if include(obj, inquisitor.records.data(obj)):
+                    results.add(obj)
         return results
 
-    def put_asset_object(self, asset, overwrite=False):
+    @inquisitor.profiling.timed('repository.store_asset')
+    def store_asset(self, asset, overwrite=False):
+        # Stores the asset without its related assets, returning its id if it
+        # was written and whether it was written
         result = None
         module = sys.modules[asset.__class__.__module__]
-        repository = self.repositories[module.REPOSITORY]
-        exists = self.get_asset_data(asset)
-        if not exists:
-            result = repository.store({'data': asset.__dict__})
-        elif overwrite:
-            repository.update(exists['__id'], {'data': asset.__dict__})
-            result = exists['__id']
-        if not exists or overwrite:
+        with self.lock:
+            exists = self.get_asset_data(asset)
+            if not exists or overwrite:
+                previous = exists['data'].get('effective_owned') if exists else False
+                asset.effective_owned = asset.is_owned(self)
+                before = None
+                if exists:
+                    before = (exists['data'].get('owned'), previous)
+                self.counts_update(
+                    module,
+                    before,
+                    (asset.owned, asset.effective_owned),
+                )
+                asset.revision = self.next_revision()
+            if not exists:
+                result = self.write_asset(None, asset)
+                if self.indexed:
+                    self.index_store(
+                        module,
+                        getattr(asset, module.OBJECT_ID),
+                        result,
+                    )
+            elif overwrite:
+                result = self.write_asset(exists['__id'], asset)
+            if not exists or overwrite:
+                self.pending_update(asset)
+                # Maintain materialized ownership
+                self.netblocks_update(asset)
+                if asset.effective_owned != previous:
+                    self.ownership_changed(asset)
+                if self.indexed:
+                    self.dependents_store(asset)
+                    if asset.effective_owned != previous:
+                        self.propagate_ownership(asset)
+        return (result, not exists or overwrite)
+
+    def put_asset_object(self, asset, overwrite=False):
+        result, stored = self.store_asset(asset, overwrite=overwrite)
+        # Related assets may need network lookups so store them unlocked
+        if stored:
             for related in asset.related(self):
                 self.put_asset_object(related, overwrite=False)
         return result
 
+    @contextlib.contextmanager
+    def transaction(self):
+        # Groups writes into a single commit, discarding all of them if an
+        # error occurs. Earlier writes are committed first so that they are
+        # never discarded along with them.
+        with self.lock:
+            self.database.commit()
+            self.database.begin()
+            try:
+                yield
+            except:
+                self.database.rollback()
+                # Owned netblocks may include discarded writes
+                self.netblocks = None
+                raise
+            self.database.commit()
+
+    @inquisitor.profiling.timed('repository.put_assets_bulk')
+    def put_assets_bulk(self, assets, overwrite=False, batch_size=1000):
+        # Stores the assets and their related assets with one commit per
+        # batch, or a single one without a batch size, returning the id of
+        # every provided asset that was written
+        assets = list(assets)
+        results = [None] * len(assets)
+        pending = collections.deque(enumerate(assets))
+        while pending:
+            with self.transaction():
+                count = 0
+                while pending and (not batch_size or count < batch_size):
+                    index, asset = pending.popleft()
+                    count += 1
+                    # Related assets are never overwritten
+                    result, stored = self.store_asset(
+                        asset,
+                        overwrite=overwrite and index is not None,
+                    )
+                    if index is not None:
+                        results[index] = result
+                    if stored:
+                        pending.extend(
+                            (None, related) for related in asset.related(self)
+                        )
+        return results
+
     def put_asset_string(
             self,
             asset_type, 
@@ -1,10 +1,85 @@
+import inquisitor.profiling
 import sys
 
 class Asset(object):
 
+    # Fields stored by the repository, in the order they are encoded in
+    # before those of every asset type. Changing them shifts the fields of
+    # stored records, which needs a new records.VERSION and a migration.
+    __slots__ = [
+        'owned',
+        'effective_owned',
+        'enriched',
+        'revision',
+        'transforms',
+    ]
+
+    # Values of the fields missing from stored records
+    DEFAULTS = {
+        # Materialized by the repository whenever the asset is stored
+        'effective_owned': False,
+        # Assets stored before enrichment was deferred were enriched on
+        # creation
+        'enriched': True,
+        # Bumped by the repository whenever the asset is stored or changes
+        'revision': 0,
+        'transforms': dict(),
+    }
+
     def __init__(self, owned=None):
         self.owned = owned
+        self.effective_owned = False
+        self.revision = 0
         self.transforms = dict()
+        self.enriched = not self.enrichment_steps()
+
+    def enrichment_steps(self):
+        # Stages of network lookups filling in the attributes of the asset.
+        # Steps within a stage may run concurrently, stages run in order.
+        return list()
+
+    def enrich(self):
+        if self.enriched:
+            return
+        for stage in self.enrichment_steps():
+            for step in stage:
+                step()
+        self.enriched = True
+
+    def ownership_dependencies(self):
+        # Assets without dependencies can only be classified manually
+        return list()
+
+    def queries(self):
+        # Returns the queries to search each source with for assets related
+        # to this one
+        return dict()
+
+    def transformed(self, source):
+        # Whether the results of the source are cached, sources which found
+        # nothing being searched again
+        return bool(self.transforms.get(source))
+
+    def transform(self, repo, sources):
+        module_name = self.__class__.__module__
+        stage = 'transform.{}'.format(module_name.split('.')[-1])
+        with inquisitor.profiling.timer(stage):
+            # Prepare the results
+            assets = set()
+            for source, queries in sorted(self.queries().iteritems()):
+                if not sources.get(source):
+                    continue
+                if self.transformed(source):
+                    subassets = self.cache_transform_get(source, repo)
+                else:
+                    subassets = set()
+                    for query in queries:
+                        subassets.update(sources[source].transform(repo, query))
+                    # Cache The Transform
+                    self.cache_transform_store(source, subassets)
+                assets.update(subassets)
+            # Return the results
+            return assets
 
     def cache_transform_store(self, source, assets):
         cached = list()
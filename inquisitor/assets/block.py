@@ -1,5 +1,8 @@
 import inquisitor.assets
 import inquisitor.assets.registrant
+import inquisitor.cache
+import inquisitor.concurrency
+import inquisitor.profiling
 import ipwhois
 import logging
 import netaddr
@@ -7,6 +10,8 @@ import netaddr
 class BlockValidateException(Exception):
     pass
 
+@inquisitor.cache.memoize(errors=BlockValidateException)
+@inquisitor.profiling.timed('canonicalize.block')
 def canonicalize(block):
     if not block:
         raise BlockValidateException('Blocks cannot be None')
@@ -19,6 +24,41 @@ def canonicalize(block):
         raise BlockValidateException('Unable to parse block {}'.format(block))
     return str(network)
 
+@inquisitor.profiling.timed('rdap')
+def rdap(ip, network=None):
+    # Performs an RDAP lookup keeping only the fields used by assets. If the
+    # answer is needed for a specific network, it has to be about exactly
+    # that network to be reused for other IP addresses.
+    def lookup():
+        with inquisitor.concurrency.limit('rdap'):
+            info = ipwhois.ipwhois.IPWhois(ip).lookup_rdap()
+        objects = dict()
+        for key, obj in (info.get('objects') or dict()).iteritems():
+            contact = obj.get('contact') or dict()
+            objects[key] = {
+                'roles': obj.get('roles'),
+                'contact': {
+                    'kind': contact.get('kind'),
+                    'name': contact.get('name'),
+                },
+            }
+        return {
+            'network': {'cidr': (info.get('network') or dict()).get('cidr')},
+            'objects': objects,
+        }
+    # A known network covering the IP makes the lookup redundant
+    found, value = inquisitor.cache.RESPONSES.get_network(network or ip)
+    if found and (network is None or network in [
+        known.strip() for known in (value['network']['cidr'] or '').split(',')
+    ]):
+        return value
+    value = inquisitor.cache.RESPONSES.fetch('rdap', ip, lookup)
+    # Networks which do not align to a single prefix span several CIDRs
+    for network in (value['network']['cidr'] or '').split(','):
+        if network.strip():
+            inquisitor.cache.RESPONSES.put_network(network.strip(), value)
+    return value
+
 def main_classify_args(parser):
     parser.add_argument(
         '-ab', '--accept-block',
@@ -65,13 +105,26 @@ def main_classify_canonicalize(args):
 
 class Block(inquisitor.assets.Asset):
 
+    __slots__ = [
+        'block',
+        'registrant',
+    ]
+
     def __init__(self, block, owned=None):
         super(self.__class__, self).__init__(owned=owned)
         self.block = canonicalize(block)
-        # Acquire IP whois for block
-        ip = str(netaddr.IPNetwork(self.block).ip)
-        info = ipwhois.ipwhois.IPWhois(ip).lookup_rdap()
+        # Registrant information is filled in by enrichment
         self.registrant = None
+
+    def enrichment_steps(self):
+        return [[self.enrich_registrant]]
+
+    @inquisitor.profiling.timed('enrich.block.registrant')
+    def enrich_registrant(self):
+        # Acquire IP whois for block
+        # Networks covering the block may belong to other registrants
+        info = rdap(str(netaddr.IPNetwork(self.block).ip), network=self.block)
+        registrant = None
         if (info.get('network') and info.get('network').get('cidr')
             and info.get('network').get('cidr') == self.block):
             for key, obj in info['objects'].iteritems():
@@ -81,8 +134,8 @@ class Block(inquisitor.assets.Asset):
                         registrant = inquisitor.assets.registrant.canonicalize(
                             name
                         )
-                        self.registrant = registrant
                         break
+        self.registrant = registrant
 
     def __eq__(self, other):
         if not isinstance(other, self.__class__):
@@ -105,24 +158,21 @@ class Block(inquisitor.assets.Asset):
         # Return the results
         return results
 
-    def transform(self, repo, sources):
-        # Prepare the results
-        assets = set()
-        # Shodan Transforms
-        if sources.get('shodan'):
-            subassets = self.cache_transform_get('shodan', repo)
-            if not subassets:
-                # Acquire API
-                shodan = sources['shodan']
-                # Query: Network
-                subassets.update(shodan.transform(
-                    repo, 'net:"{}"'.format(self.block))
-                )
-                # Cache The Transform
-                self.cache_transform_store('shodan', subassets)
-            assets.update(subassets)
-        # Return the results
-        return assets
+    def queries(self):
+        return {
+            'shodan': [
+                'net:"{}"'.format(self.block),
+            ],
+        }
+
+    def ownership_dependencies(self):
+        dependencies = list()
+        if self.registrant:
+            dependencies.append((
+                inquisitor.assets.registrant.Registrant,
+                self.registrant,
+            ))
+        return dependencies
 
     def is_owned(self, repo):
         # If manually classified, return the classification
@@ -135,7 +185,7 @@ class Block(inquisitor.assets.Asset):
                     inquisitor.assets.registrant.Registrant,
                     self.registrant,
                 )
-                if registrant and registrant[1].is_owned(repo):
+                if registrant and registrant[1].effective_owned:
                     return True
             except inquisitor.assets.registrant.RegistrantValidateException as e:
                 logging.error(e.message)
@@ -146,38 +196,9 @@ class Block(inquisitor.assets.Asset):
         parent = None
         # Check if this is a child of another netblock
         if parent is None:
-            # Acquire start and end IPs of this netblock
-            network = netaddr.IPNetwork(self.block)
-            network_start = network.ip & network.netmask
-            network_end = network_start + (network.size - 1)
-            # Acquire other owned netblocks
-            blocks = repo.get_assets(
-                include=lambda o,d: (
-                    self != o and
-                    isinstance(o, self.__class__) and
-                    o.is_owned(repo)
-                )
-            )
-            # Check if this netblock is a child of another netblock
-            parents = list()
-            for block in blocks:
-                # Acquire start and end IPs of the other netblock
-                other = netaddr.IPNetwork(block.block)
-                other_start = other.ip & other.netmask
-                other_end = other_start + (other.size - 1)
-                # Check if self is contained by the other netblock
-                contained = (
-                    other_start <= network_start and
-                    network_end <= other_end and
-                    network.size < other.size
-                )
-                # If contained, add as potential parent
-                candidate = [block, other]
-                if contained and candidate not in parents:
-                    parents.append(candidate)
-            # Return the smallest parent
-            if parents:
-                parent = min(parents, key=lambda e: e[1])[0]
+            # Acquire the smallest owned netblock strictly containing self
+            parent = repo.get_owned_block(self.block, strict=True)
+            if parent:
                 return parent
         # Check if registrant is a valid parent
         if parent is None:
@@ -187,7 +208,7 @@ class Block(inquisitor.assets.Asset):
                         inquisitor.assets.registrant.Registrant,
                         self.registrant,
                     )
-                    if registrant and registrant[1].is_owned(repo):
+                    if registrant and registrant[1].effective_owned:
                         parent = registrant[1]
                         return parent
                 except inquisitor.assets.registrant.RegistrantValidateException as e:
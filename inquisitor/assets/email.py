@@ -1,11 +1,15 @@
 import inquisitor.assets
 import inquisitor.assets.host
+import inquisitor.cache
+import inquisitor.profiling
 import logging
 import validate_email
 
 class EmailValidateException(Exception):
     pass
 
+@inquisitor.cache.memoize(errors=EmailValidateException)
+@inquisitor.profiling.timed('canonicalize.email')
 def canonicalize(email):
     if not email:
         raise EmailValidateException('Emails cannot be None')
@@ -71,6 +75,12 @@ def main_classify_canonicalize(args):
 
 class Email(inquisitor.assets.Asset):
 
+    __slots__ = [
+        'email',
+        'recipient',
+        'domain',
+    ]
+
     def __init__(self, email, owned=None):
         super(self.__class__, self).__init__(owned=owned)
         self.email = canonicalize(email)
@@ -98,24 +108,15 @@ class Email(inquisitor.assets.Asset):
         # Return the results
         return results
 
-    def transform(self, repo, sources):
-        # Prepare the results
-        assets = set()
-        # Google Transforms
-        if sources.get('google'):
-            subassets = self.cache_transform_get('google', repo)
-            if not subassets:
-                # Acquire API
-                google = sources['google']
-                # Query: Email
-                subassets.update(google.transform(
-                    repo, '"{}"'.format(self.email))
-                )
-                # Cache The Transform
-                self.cache_transform_store('google', subassets)
-            assets.update(subassets)
-        # Return the results
-        return assets
+    def queries(self):
+        return {
+            'google': [
+                '"{}"'.format(self.email),
+            ],
+        }
+
+    def ownership_dependencies(self):
+        return [(inquisitor.assets.host.Host, self.domain)]
 
     def is_owned(self, repo):
         # If manually classified, return the classification
@@ -124,7 +125,7 @@ class Email(inquisitor.assets.Asset):
         # Automatically determine ownership
         try:
             host = repo.get_asset_string(inquisitor.assets.host.Host, self.domain)
-            if host and host[1].is_owned(repo):
+            if host and host[1].effective_owned:
                 return True
         except inquisitor.assets.host.HostValidateException as e:
             logging.error(e.message)
@@ -138,7 +139,7 @@ class Email(inquisitor.assets.Asset):
             if self.domain:
                 try:
                     host = repo.get_asset_string(inquisitor.assets.host.Host, self.domain)
-                    if host and host[1].is_owned(repo):
+                    if host and host[1].effective_owned:
                         parent = host[1]
                         return parent
                 except inquisitor.assets.host.HostValidateException as e:
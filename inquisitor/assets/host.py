@@ -2,16 +2,20 @@ import inquisitor.assets
 import inquisitor.assets.block
 import inquisitor.assets.email
 import inquisitor.assets.registrant
+import inquisitor.cache
+import inquisitor.concurrency
+import inquisitor.profiling
+import inquisitor.resolver
 import ipwhois
 import logging
-import netaddr
-import socket
 import tld
 import whois
 
 class HostValidateException(Exception):
     pass
 
+@inquisitor.cache.memoize(errors=HostValidateException)
+@inquisitor.profiling.timed('canonicalize.host')
 def canonicalize(host):
     if not host:
         raise HostValidateException('Hosts cannot be None')
@@ -24,6 +28,18 @@ def canonicalize(host):
         raise HostValidateException('Invalid tld for host {}'.format(host))
     return host
 
+@inquisitor.profiling.timed('whois')
+def whois_lookup(host):
+    # Performs a whois lookup keeping only the fields used by assets
+    def lookup():
+        with inquisitor.concurrency.limit('whois'):
+            info = whois.whois(host)
+        return dict(
+            (key, info.get(key))
+            for key in ['org', 'emails', 'name_servers']
+        )
+    return inquisitor.cache.RESPONSES.fetch('whois', host, lookup)
+
 def main_classify_args(parser):
     parser.add_argument(
         '-ah', '--accept-host',
@@ -69,7 +85,21 @@ def main_classify_canonicalize(args):
     return (accepted, unmarked, rejected)
 
 class Host(inquisitor.assets.Asset):
-    
+
+    __slots__ = [
+        'host',
+        'parent',
+        'ip',
+        'addresses',
+        'registrant',
+        'emails',
+        'nameservers',
+        'blocks',
+    ]
+
+    # Records stored before IPv6 support lack the resolved addresses
+    DEFAULTS = dict(inquisitor.assets.Asset.DEFAULTS, addresses=list())
+
     def __init__(self, host, owned=None):
         super(self.__class__, self).__init__(owned=owned)
         self.host = canonicalize(host)
@@ -78,54 +108,83 @@ class Host(inquisitor.assets.Asset):
         zones = self.host.split('.')
         if len(zones) > 1:
             self.parent = canonicalize('.'.join(zones[1:]))
-        # Acquire IP address
+        # Network information is filled in by enrichment
         self.ip = None
-        try: self.ip = socket.gethostbyname(self.host)
-        except: pass
-        # Acquire whois information
+        self.addresses = list()
         self.registrant = None
-        self.emails = set()
-        self.nameservers = set()
+        self.emails = list()
+        self.nameservers = list()
+        self.blocks = list()
+
+    def enrichment_steps(self):
+        # Whois and RDAP lookups both need the IP address to be resolved.
+        # Each step assigns its fields at the end, so a lookup that raises
+        # leaves them as they were, while hosts that do not resolve are
+        # left without addresses and skip the other lookups.
+        return [
+            [self.enrich_ip],
+            [self.enrich_whois, self.enrich_blocks],
+        ]
+
+    @inquisitor.profiling.timed('enrich.host.ip')
+    def enrich_ip(self):
+        # Acquire IP addresses, preferring IPv4 for the whois and RDAP lookups
+        addresses = list()
+        try: addresses = inquisitor.resolver.resolve(self.host)
+        except inquisitor.resolver.ResolverException: pass
+        self.addresses = addresses
+        self.ip = addresses[0] if addresses else None
+
+    @inquisitor.profiling.timed('enrich.host.whois')
+    def enrich_whois(self):
+        # Acquire whois information
+        registrant = None
+        emails = set()
+        nameservers = set()
         if self.ip:
-            info = whois.whois(self.host)
+            info = whois_lookup(self.host)
             if info.get('org'):
-                self.registrant = inquisitor.assets.registrant.canonicalize(
+                registrant = inquisitor.assets.registrant.canonicalize(
                     info['org']
                 )
             if info.get('emails'):
                 if type(info['emails']) is list:
                     for email in info['emails']:
-                        self.emails.add(inquisitor.assets.email.canonicalize(email))
+                        emails.add(inquisitor.assets.email.canonicalize(email))
                 elif type(info['emails']) in [str, unicode]:
                     email = info['emails']
-                    self.emails.add(inquisitor.assets.email.canonicalize(email))
+                    emails.add(inquisitor.assets.email.canonicalize(email))
             if info.get('name_servers'):
                 if type(info['name_servers']) is list:
                     for nameserver in info['name_servers']:
-                        self.nameservers.add(canonicalize(nameserver))
+                        nameservers.add(canonicalize(nameserver))
                 elif type(info['name_servers']) in [str, unicode]:
                     nameserver = info['name_servers']
-                    self.nameservers.add(canonicalize(nameserver))
-        self.emails = list(self.emails)
-        self.nameservers = list(self.nameservers)
+                    nameservers.add(canonicalize(nameserver))
+        self.registrant = registrant
+        self.emails = list(emails)
+        self.nameservers = list(nameservers)
+
+    @inquisitor.profiling.timed('enrich.host.blocks')
+    def enrich_blocks(self):
         # Acquire IP whois information
-        self.blocks = set()
+        blocks = set()
         if self.ip:
-            tries = 0
-            while tries < 3:
+            for tries in range(3):
                 try:
-                    info = ipwhois.ipwhois.IPWhois(self.ip).lookup_rdap()
-                    for block in info['network']['cidr'].split(','):
-                        block = inquisitor.assets.block.canonicalize(block.strip())
-                        self.blocks.add(block)
-                    tries += 1
+                    info = inquisitor.assets.block.rdap(self.ip)
                 except ipwhois.exceptions.HTTPLookupError:
                     continue
                 except ipwhois.exceptions.HTTPRateLimitError:
                     continue
                 except ipwhois.exceptions.IPDefinedError:
-                    continue
-        self.blocks = list(self.blocks)
+                    break
+                for block in (info['network']['cidr'] or '').split(','):
+                    if block.strip():
+                        block = inquisitor.assets.block.canonicalize(block.strip())
+                        blocks.add(block)
+                break
+        self.blocks = list(blocks)
 
     def __eq__(self, other):
         if not isinstance(other, self.__class__):
@@ -188,53 +247,39 @@ class Host(inquisitor.assets.Asset):
         # Return the results
         return results
 
-    def transform(self, repo, sources):
-        # Prepare the results
-        assets = set()
-        # Google Transforms
-        if sources.get('google'):
-            subassets = self.cache_transform_get('google', repo)
-            if not subassets:
-                # Acquire API
-                google = sources['google']
-                # Query: Site
-                subassets.update(google.transform(
-                    repo, 'site:{}'.format(self.host))
-                )
-                # Query: Email
-                subassets.update(google.transform(
-                    repo, '"@{}"'.format(self.host))
-                )
-                # Cache The Transform
-                self.cache_transform_store('google', subassets)
-            assets.update(subassets)
-        # Shodan Transforms
-        if sources.get('shodan'):
-            subassets = self.cache_transform_get('shodan', repo)
-            if not subassets:
-                # Acquire API
-                shodan = sources['shodan']
-                # Query: Plain
-                subassets.update(shodan.transform(repo, self.host))
-                # Query: Hostname
-                subassets.update(shodan.transform(
-                    repo, 'hostname:"{}"'.format(self.host))
-                )
-                # Cache The Transform
-                self.cache_transform_store('shodan', subassets)
-            assets.update(subassets)
-        # Return the results
-        return assets
+    def queries(self):
+        return {
+            'google': [
+                'site:{}'.format(self.host),
+                '"@{}"'.format(self.host),
+            ],
+            'shodan': [
+                self.host,
+                'hostname:"{}"'.format(self.host),
+            ],
+        }
+
+    def ownership_dependencies(self):
+        dependencies = list()
+        # Single label parents are never stored, as in related
+        if self.parent and len(self.parent.split('.')) > 1:
+            dependencies.append((Host, self.parent))
+        if self.registrant:
+            dependencies.append((
+                inquisitor.assets.registrant.Registrant,
+                self.registrant,
+            ))
+        return dependencies
 
     def is_owned(self, repo):
         # If manually classified, return the classification
         if self.owned is not None:
             return self.owned
         # Automatically determine ownership
-        if self.parent:
+        if self.parent and len(self.parent.split('.')) > 1:
             try:
                 parent = repo.get_asset_string(Host, self.parent)
-                if parent and parent[1].is_owned(repo):
+                if parent and parent[1].effective_owned:
                     return True
             except HostValidateException as e:
                 logging.error(e.message)
@@ -244,7 +289,7 @@ class Host(inquisitor.assets.Asset):
                     inquisitor.assets.registrant.Registrant,
                     self.registrant
                 )
-                if registrant and registrant[1].is_owned(repo):
+                if registrant and registrant[1].effective_owned:
                     return True
             except inquisitor.assets.registrant.RegistrantValidateException as e:
                 logging.error(e.message)
@@ -258,7 +303,7 @@ class Host(inquisitor.assets.Asset):
             if self.parent:
                 try:
                     domain = repo.get_asset_string(Host, self.parent)
-                    if domain and domain[1].is_owned(repo):
+                    if domain and domain[1].effective_owned:
                         parent = domain[1]
                         return parent
                 except HostValidateException as e:
@@ -266,23 +311,9 @@ class Host(inquisitor.assets.Asset):
         # Check if this host is the child of a network
         if parent is None:
             if self.ip:
-                # Acquire owned netblocks where self is contained
-                address = netaddr.IPAddress(self.ip)
-                blocks = repo.get_assets(
-                    include=lambda o,d: (
-                        isinstance(o, inquisitor.assets.block.Block) and
-                        o.is_owned(repo) and
-                        address in netaddr.IPNetwork(o.block)
-                    )
-                )
-                # Collate blocks and their corresponding network object
-                parents = [
-                    [block, netaddr.IPNetwork(block.block)]
-                    for block in blocks
-                ]
-                # Return the smallest parent
-                if parents:
-                    parent = min(parents, key=lambda e: e[1])[0]
+                # Acquire the smallest owned netblock where self is contained
+                parent = repo.get_owned_block(self.ip)
+                if parent:
                     return parent
         # Check if registrant is a valid parent
         if parent is None:
@@ -292,7 +323,7 @@ class Host(inquisitor.assets.Asset):
                         inquisitor.assets.registrant.Registrant,
                         self.registrant,
                     )
-                    if registrant and registrant[1].is_owned(repo):
+                    if registrant and registrant[1].effective_owned:
                         parent = registrant[1]
                         return parent
                 except inquisitor.assets.registrant.RegistrantValidateException as e:
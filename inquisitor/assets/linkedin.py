@@ -1,11 +1,15 @@
 import inquisitor.assets
 import inquisitor.assets.registrant
+import inquisitor.cache
+import inquisitor.profiling
 import logging
 import urlparse
 
 class LinkedInValidateException(Exception):
     pass
 
+@inquisitor.cache.memoize(errors=LinkedInValidateException)
+@inquisitor.profiling.timed('canonicalize.linkedin')
 def canonicalize(linkedin):
     if not linkedin:
         raise LinkedInValidateException('LinkedIn accounts cannot be None')
@@ -73,6 +77,12 @@ def main_classify_canonicalize(args):
 
 class LinkedIn(inquisitor.assets.Asset):
 
+    __slots__ = [
+        'linkedin',
+        'username',
+        'corporation',
+    ]
+
     def __init__(self, linkedin, owned=False):
         super(self.__class__, self).__init__(owned=owned)
         self.linkedin = canonicalize(linkedin)
@@ -103,11 +113,14 @@ class LinkedIn(inquisitor.assets.Asset):
         # Return the results
         return results
 
-    def transform(self, repo, sources):
-        # Prepare the results
-        assets = set()
-        # Return the results
-        return assets
+    def ownership_dependencies(self):
+        dependencies = list()
+        if self.corporation:
+            dependencies.append((
+                inquisitor.assets.registrant.Registrant,
+                self.corporation,
+            ))
+        return dependencies
 
     def is_owned(self, repo):
         # If manually classified, return the classification
@@ -120,7 +133,7 @@ class LinkedIn(inquisitor.assets.Asset):
                     inquisitor.assets.registrant.Registrant,
                     self.corporation
                 )
-                if registrant and registrant[1].is_owned(repo):
+                if registrant and registrant[1].effective_owned:
                     return True
             except inquisitor.assets.registrant.RegistrantValidateException as e:
                 logging.error(e.message)
@@ -137,7 +150,7 @@ class LinkedIn(inquisitor.assets.Asset):
                         inquisitor.assets.registrant.Registrant,
                         self.corporation,
                     )
-                    if registrant and registrant[1].is_owned(repo):
+                    if registrant and registrant[1].effective_owned:
                         parent = registrant[1]
                         return parent
                 except inquisitor.assets.registrant.RegistrantValidateException as e:
@@ -1,10 +1,14 @@
 import inquisitor.assets
+import inquisitor.cache
+import inquisitor.profiling
 import unidecode
 import urlparse
 
 class RegistrantValidateException(Exception):
     pass
 
+@inquisitor.cache.memoize(errors=RegistrantValidateException)
+@inquisitor.profiling.timed('canonicalize.registrant')
 def canonicalize(registrant):
     if not registrant:
         raise RegistrantValidateException('Registrants cannot be None')
@@ -59,6 +63,10 @@ def main_classify_canonicalize(args):
 
 class Registrant(inquisitor.assets.Asset):
 
+    __slots__ = [
+        'registrant',
+    ]
+
     def __init__(self, registrant, owned=None):
         super(self.__class__, self).__init__(owned=owned)
         self.registrant = canonicalize(registrant)
@@ -74,41 +82,17 @@ class Registrant(inquisitor.assets.Asset):
         # Return the results
         return results
 
-    def transform(self, repo, sources):
-        # Prepare the results
-        assets = set()
-        # Google Transforms
-        if sources.get('google'):
-            subassets = self.cache_transform_get('google', repo)
-            if not subassets:
-                # Acquire API
-                google = sources['google']
-                # Query: Plain
-                subassets.update(google.transform(repo, self.registrant))
-                # Query: LinkedIn
-                subassets.update(google.transform(
-                    repo, 'site:linkedin.com {}'.format(self.registrant)
-                ))
-                # Cache The Transform
-                self.cache_transform_store('google', subassets)
-            assets.update(subassets)
-        # Shodan Transforms
-        if sources.get('shodan'):
-            subassets = self.cache_transform_get('shodan', repo)
-            if not subassets:
-                # Acquire API
-                shodan = sources['shodan']
-                # Query: Plain
-                subassets.update(shodan.transform(repo, self.registrant))
-                # Query: Organization
-                subassets.update(shodan.transform(
-                    repo, 'org:"{}"'.format(self.registrant))
-                )
-                # Cache The Transform
-                self.cache_transform_store('shodan', subassets)
-            assets.update(subassets)
-        # Return the results
-        return assets
+    def queries(self):
+        return {
+            'google': [
+                self.registrant,
+                'site:linkedin.com {}'.format(self.registrant),
+            ],
+            'shodan': [
+                self.registrant,
+                'org:"{}"'.format(self.registrant),
+            ],
+        }
 
     def is_owned(self, repo):
         if self.owned:
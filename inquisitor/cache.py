@@ -0,0 +1,176 @@
+import collections
+import functools
+import inquisitor.netblocks
+import json
+import threading
+import time
+import unqlite
+
+CACHE_PREFIX = 'cache:'
+
+# Number of results remembered by each memoized function
+MEMO_SIZE = 100000
+
+# Default number of seconds responses of each type are reused for
+DEFAULT_TTLS = {
+    'dns': 24 * 60 * 60,
+    'whois': 7 * 24 * 60 * 60,
+    'rdap': 7 * 24 * 60 * 60,
+    'network': 7 * 24 * 60 * 60,
+    'nxdomain': 60 * 60,
+    'google': 24 * 60 * 60,
+}
+
+class ResponseCache(object):
+
+    def __init__(self, path=':mem:', ttls=None, refresh=False):
+        self.database = unqlite.UnQLite(path)
+        self.lock = threading.Lock()
+        self.ttls = dict(DEFAULT_TTLS)
+        self.ttls.update(ttls or dict())
+        self.refresh = refresh
+        self.hits = dict()
+        self.misses = dict()
+        # RDAP responses of known networks, looked up by longest prefix match
+        self.networks = inquisitor.netblocks.PrefixTable()
+        prefix = self.key('network', '')
+        for key, value in self.database.match_prefix(prefix):
+            self.networks.add(key[len(prefix):], json.loads(value))
+
+    def key(self, kind, name):
+        if isinstance(name, str):
+            name = name.decode('utf-8')
+        return u'{}{}:{}'.format(CACHE_PREFIX, kind, name).encode('utf-8')
+
+    def count(self, counters, kind):
+        counters[kind] = counters.get(kind, 0) + 1
+
+    def get(self, kind, name):
+        # Returns a (found, value) tuple since None may be a cached value
+        key = self.key(kind, name)
+        with self.lock:
+            entry = None
+            if not self.refresh and self.database.exists(key):
+                entry = json.loads(self.database[key])
+                if entry['expires'] <= time.time():
+                    del self.database[key]
+                    entry = None
+            self.count(self.hits if entry else self.misses, kind)
+        if entry is None:
+            return (False, None)
+        return (True, entry['value'])
+
+    def put(self, kind, name, value, ttl=None):
+        if ttl is None:
+            ttl = self.ttls.get(kind, 0)
+        entry = {
+            'expires': time.time() + ttl,
+            'value': value,
+        }
+        with self.lock:
+            self.database[self.key(kind, name)] = json.dumps(entry)
+
+    def fetch(self, kind, name, function):
+        # Returns the cached response or performs and caches the lookup.
+        # Failed lookups raise and are therefore never cached.
+        found, value = self.get(kind, name)
+        if not found:
+            value = function()
+            self.put(kind, name, value)
+        return value
+
+    def get_network(self, address):
+        # Returns the RDAP response of the smallest known network covering
+        # the IP address as a (found, value) tuple
+        with self.lock:
+            entry = None
+            if not self.refresh:
+                match = self.networks.longest_match(address)
+                if match:
+                    network, entry = match
+                    if entry['expires'] <= time.time():
+                        self.networks.remove(network)
+                        entry = None
+            self.count(self.hits if entry else self.misses, 'network')
+        if entry is None:
+            return (False, None)
+        return (True, entry['value'])
+
+    def put_network(self, network, value):
+        entry = {
+            'expires': time.time() + self.ttls.get('network', 0),
+            'value': value,
+        }
+        with self.lock:
+            self.networks.add(network, entry)
+            self.database[self.key('network', network)] = json.dumps(entry)
+
+    def evict(self):
+        # Removes every expired response
+        now = time.time()
+        networks = self.key('network', '')
+        with self.lock:
+            expired = [
+                key for key, value in self.database.match_prefix(CACHE_PREFIX)
+                if json.loads(value)['expires'] <= now
+            ]
+            for key in expired:
+                del self.database[key]
+                if key.startswith(networks):
+                    self.networks.remove(key[len(networks):])
+        return len(expired)
+
+    def stats(self):
+        kinds = sorted(set(self.hits.keys() + self.misses.keys()))
+        return [
+            [kind, self.hits.get(kind, 0), self.misses.get(kind, 0)]
+            for kind in kinds
+        ]
+
+    def close(self):
+        with self.lock:
+            self.database.close()
+
+# Used by asset enrichment, only kept in memory until configured otherwise
+RESPONSES = ResponseCache()
+
+def configure(path=':mem:', ttls=None, refresh=False):
+    global RESPONSES
+    RESPONSES = ResponseCache(path, ttls=ttls, refresh=refresh)
+    RESPONSES.evict()
+    return RESPONSES
+
+def memoize(errors=(), size=MEMO_SIZE):
+    # Remembers the results of a function of a single string along with the
+    # specified exceptions it raises, forgetting the least recently used ones
+    # once there are more than size of them
+    def decorator(function):
+        memo = collections.OrderedDict()
+        lock = threading.Lock()
+        @functools.wraps(function)
+        def wrapper(value):
+            if not isinstance(value, basestring):
+                return function(value)
+            # Equal str and unicode values are remembered separately
+            key = (type(value), value)
+            with lock:
+                entry = memo.pop(key, None)
+                if entry is not None:
+                    memo[key] = entry
+            if entry is None:
+                try:
+                    entry = (True, function(value))
+                except errors as e:
+                    entry = (False, e)
+                with lock:
+                    memo[key] = entry
+                    while len(memo) > size:
+                        memo.popitem(last=False)
+            found, result = entry
+            if not found:
+                raise result
+            return result
+        wrapper.memo = memo
+        wrapper.function = function
+        return wrapper
+    return decorator
@@ -0,0 +1,89 @@
+import csv
+import inquisitor
+import json
+import logging
+
+# Accepted spellings of each classification
+VERDICTS = {
+    'accept': True,
+    'accepted': True,
+    'true': True,
+    'unmark': None,
+    'unmarked': None,
+    'unknown': None,
+    'none': None,
+    'reject': False,
+    'rejected': False,
+    'false': False,
+}
+
+class ClassificationException(Exception):
+    pass
+
+def asset_module(name):
+    # Asset types may be named after their module, class, or repository
+    name = (name or '').strip().lower()
+    for module in inquisitor.ASSET_MODULES:
+        if name in [
+            module.__name__.split('.')[-1],
+            module.ASSET_CLASS.__name__.lower(),
+            module.REPOSITORY,
+        ]:
+            return module
+    raise ClassificationException('Unknown asset type {}'.format(name))
+
+def verdict(value):
+    if isinstance(value, bool) or value is None:
+        return value
+    value = value.strip().lower()
+    if value not in VERDICTS:
+        raise ClassificationException('Unknown verdict {}'.format(value))
+    return VERDICTS[value]
+
+def read(lines):
+    # Yields (asset module, canonical identifier, owned) for every row of
+    # CSV lines or NDJSON lines with type, identifier, and verdict fields,
+    # logging the invalid ones
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            if line.startswith('{'):
+                row = json.loads(line)
+                row = [
+                    row.get('type'),
+                    row.get('identifier'),
+                    row.get('verdict'),
+                ]
+            else:
+                row = next(csv.reader([line]))
+                # Skip the optional header
+                if number == 1 and [c.strip().lower() for c in row] == [
+                    'type', 'identifier', 'verdict',
+                ]:
+                    continue
+            if len(row) != 3:
+                raise ClassificationException(
+                    'Expected type, identifier, and verdict'
+                )
+            module = asset_module(row[0])
+            owned = verdict(row[2])
+            identifier = module.canonicalize(row[1])
+        except Exception as e:
+            # Every asset type raises its own validation exception
+            logging.error('Line {}: {}'.format(number, e))
+            continue
+        yield (module, identifier, owned)
+
+def load(lines):
+    # Returns the assets classified by the lines, the last classification of
+    # an asset overriding the earlier ones
+    classified = dict()
+    for module, identifier, owned in read(lines):
+        classified[(module.__name__, identifier)] = (module, owned)
+    return [
+        module.ASSET_CLASS(identifier, owned=owned)
+        for (module_name, identifier), (module, owned)
+        in sorted(classified.items())
+    ]
@@ -0,0 +1,106 @@
+import Queue
+import sys
+import threading
+import time
+
+# Default (concurrency, requests per second) of each rate limited source
+DEFAULT_LIMITS = {
+    'google': (4, 10.0),
+    'shodan': (1, 1.0),
+    'rdap': (4, 5.0),
+    'whois': (4, 2.0),
+    'dns': (16, None),
+}
+
+LIMITERS = dict()
+LIMITERS_LOCK = threading.Lock()
+
+class TokenBucket(object):
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity or max(1.0, rate))
+        self.tokens = self.capacity
+        self.timestamp = time.time()
+        self.lock = threading.Lock()
+
+    def consume(self):
+        while True:
+            with self.lock:
+                now = time.time()
+                self.tokens = min(
+                    self.capacity,
+                    self.tokens + (now - self.timestamp) * self.rate,
+                )
+                self.timestamp = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+class Limiter(object):
+
+    def __init__(self, concurrency=None, rate=None):
+        self.concurrency = concurrency
+        self.semaphore = None
+        if concurrency:
+            self.semaphore = threading.BoundedSemaphore(concurrency)
+        self.bucket = TokenBucket(rate) if rate else None
+
+    def __enter__(self):
+        if self.semaphore:
+            self.semaphore.acquire()
+        if self.bucket:
+            self.bucket.consume()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self.semaphore:
+            self.semaphore.release()
+        return False
+
+def configure(source, concurrency=None, rate=None):
+    with LIMITERS_LOCK:
+        LIMITERS[source] = Limiter(concurrency=concurrency, rate=rate)
+
+def limit(source):
+    # Returns the limiter to wrap every request made to the source with
+    with LIMITERS_LOCK:
+        if source not in LIMITERS:
+            concurrency, rate = DEFAULT_LIMITS.get(source, (None, None))
+            LIMITERS[source] = Limiter(concurrency=concurrency, rate=rate)
+        return LIMITERS[source]
+
+def run_concurrently(function, items, workers=1):
+    # Applies the function to the items on a pool of worker threads and
+    # yields (item, result) pairs in the calling thread as they complete
+    tasks = Queue.Queue()
+    results = Queue.Queue()
+    for item in items:
+        tasks.put(item)
+    pending = tasks.qsize()
+    def work():
+        while True:
+            try:
+                item = tasks.get_nowait()
+            except Queue.Empty:
+                return
+            try:
+                results.put((item, function(item), None))
+            except Exception:
+                results.put((item, None, sys.exc_info()))
+    for index in range(max(1, min(workers, pending))):
+        thread = threading.Thread(target=work)
+        thread.daemon = True
+        thread.start()
+    while pending:
+        try:
+            # Poll so that the calling thread remains interruptible
+            item, result, error = results.get(True, 1)
+        except Queue.Empty:
+            continue
+        pending -= 1
+        if error:
+            raise error[0], error[1], error[2]
+        yield (item, result)
@@ -0,0 +1,93 @@
+import inquisitor.concurrency
+import inquisitor.records
+import logging
+import sys
+import threading
+
+# Default number of concurrent lookups and seconds allowed per lookup
+WORKERS = 16
+TIMEOUT = 30
+
+class EnrichmentTimeout(Exception):
+    pass
+
+def configure(workers=None, timeout=None):
+    global WORKERS, TIMEOUT
+    if workers:
+        WORKERS = workers
+    if timeout:
+        TIMEOUT = timeout
+
+def describe(step):
+    asset = step.__self__
+    asset_module = sys.modules[asset.__class__.__module__]
+    # Assets outside of asset modules are only described by their type
+    object_id = getattr(asset_module, 'OBJECT_ID', None)
+    return '{}: {}: {}'.format(
+        asset.__class__.__module__,
+        getattr(asset, object_id) if object_id else asset.__class__.__name__,
+        step.__name__,
+    )
+
+def call_with_timeout(function, timeout):
+    # Lookups cannot be cancelled so a lookup that times out is abandoned on
+    # a daemon thread instead
+    errors = list()
+    def target():
+        try:
+            function()
+        except Exception:
+            errors.append(sys.exc_info())
+    thread = threading.Thread(target=target)
+    thread.daemon = True
+    thread.start()
+    thread.join(timeout)
+    if thread.is_alive():
+        raise EnrichmentTimeout('Timed out after {} seconds'.format(timeout))
+    if errors:
+        raise errors[0][0], errors[0][1], errors[0][2]
+
+def enrich(assets, workers=None, timeout=None):
+    workers = workers or WORKERS
+    timeout = timeout or TIMEOUT
+    # Every asset is only ever enriched once
+    assets = [asset for asset in assets if not asset.enriched]
+    # Group the lookups of all assets by stage
+    stages = list()
+    for asset in assets:
+        for index, steps in enumerate(asset.enrichment_steps()):
+            if len(stages) <= index:
+                stages.append(list())
+            stages[index].extend(steps)
+    # Perform the lookups of each stage concurrently
+    def run(step):
+        try:
+            call_with_timeout(step, timeout)
+        except EnrichmentTimeout as e:
+            logging.error('Enrichment failed: {}: {}'.format(describe(step), e))
+            return False
+        except Exception as e:
+            logging.error('Enrichment failed: {}: {}'.format(describe(step), e))
+        return True
+    abandoned = set()
+    for steps in stages:
+        for step, finished in inquisitor.concurrency.run_concurrently(
+            run,
+            steps,
+            workers=workers,
+        ):
+            if not finished:
+                abandoned.add(id(step.__self__))
+    # Lookups that timed out may still assign their results, so assets with
+    # such lookups are replaced by copies of what they hold at this point
+    results = list()
+    for asset in assets:
+        if id(asset) in abandoned:
+            asset = inquisitor.records.load(
+                type(asset),
+                inquisitor.records.data(asset),
+            )
+        # Failed lookups are not retried so as not to hammer the sources
+        asset.enriched = True
+        results.append(asset)
+    return results
@@ -0,0 +1,53 @@
+import netaddr
+
+def network_mask(version, prefixlen):
+    width = 32 if version == 4 else 128
+    return ((1 << width) - 1) ^ ((1 << (width - prefixlen)) - 1)
+
+class PrefixTable(object):
+
+    def __init__(self):
+        # Networks are grouped by IP version and prefix length so that a
+        # lookup only needs one hash probe per prefix length in use
+        self.tables = dict()
+        self.prefixlens = {4: list(), 6: list()}
+
+    def __len__(self):
+        return sum(len(table) for table in self.tables.values())
+
+    def add(self, network, value):
+        network = netaddr.IPNetwork(network)
+        key = (network.version, network.prefixlen)
+        if key not in self.tables:
+            self.tables[key] = dict()
+            prefixlens = self.prefixlens[network.version]
+            prefixlens.append(network.prefixlen)
+            prefixlens.sort(reverse=True)
+        self.tables[key][network.first] = value
+
+    def remove(self, network):
+        network = netaddr.IPNetwork(network)
+        key = (network.version, network.prefixlen)
+        table = self.tables.get(key)
+        if table is None or network.first not in table:
+            return
+        del table[network.first]
+        if not table:
+            del self.tables[key]
+            self.prefixlens[network.version].remove(network.prefixlen)
+
+    def longest_match(self, network, strict=False):
+        # Returns the most specific (network, value) pair containing the
+        # provided IP address or CIDR, excluding itself if strict is set
+        network = netaddr.IPNetwork(network)
+        for prefixlen in self.prefixlens[network.version]:
+            if prefixlen > network.prefixlen:
+                continue
+            if strict and prefixlen == network.prefixlen:
+                continue
+            table = self.tables[(network.version, prefixlen)]
+            first = network.value & network_mask(network.version, prefixlen)
+            if first in table:
+                match = netaddr.IPNetwork((first, prefixlen), network.version)
+                return (str(match), table[first])
+        return None
@@ -0,0 +1,105 @@
+import inquisitor.profiling
+import threading
+
+def normalize(query):
+    # Sources ignore case and repeated whitespace
+    return ' '.join(query.split()).lower()
+
+class PlannedSource(object):
+
+    # Issues the queries of a source through the planner of a scan
+
+    def __init__(self, planner, name, source):
+        self.planner = planner
+        self.name = name
+        self.source = source
+
+    def transform(self, repository, query):
+        return self.planner.remember(
+            ('query', self.name, normalize(query)),
+            lambda: self.source.transform(
+                repository,
+                query,
+                remember=self.planner.remember,
+            ),
+        )
+
+class QueryPlanner(object):
+
+    # Shares the results of source queries across every asset transformed by
+    # a scan, so that queries which only differ in case or spacing are issued
+    # once, and remembers the assets built from result items, so that items
+    # found by several queries are only turned into assets once. Results are
+    # only kept until cleared, which scans do after every round so that
+    # memory stays bounded and later rounds never get assets built before
+    # the earlier ones were stored.
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = dict()
+        self.reused = dict()
+
+    def wrap(self, sources):
+        # Returns the sources with their queries issued through the planner
+        return dict(
+            (name, PlannedSource(self, name, source))
+            for name, source in sources.iteritems()
+        )
+
+    def plan(self, assets, sources):
+        # Returns the number of queries the assets would issue to the sources
+        # and the number of them left once those differing only in case or
+        # spacing and those already issued since the planner was last
+        # cleared are left out
+        total = 0
+        keys = set()
+        for asset in assets:
+            for source, queries in asset.queries().iteritems():
+                # Transforms already performed are not searched again
+                if not sources.get(source) or asset.transformed(source):
+                    continue
+                total += len(queries)
+                keys.update(('query', source, normalize(q)) for q in queries)
+        with self.lock:
+            planned = len(keys.difference(self.entries))
+        inquisitor.profiling.count('planner.queries', total)
+        inquisitor.profiling.count('planner.duplicates', total - planned)
+        return (total, planned)
+
+    def remember(self, key, function):
+        # Returns the result of the function remembered under the key, only
+        # ever calling it once at a time for a key. Other calls for the key
+        # wait for its result instead. Failures are not remembered.
+        while True:
+            with self.lock:
+                entry = self.entries.get(key)
+                if entry is None:
+                    entry = [threading.Event(), False, None]
+                    self.entries[key] = entry
+                    break
+            entry[0].wait()
+            if entry[1]:
+                with self.lock:
+                    self.reused[key[0]] = self.reused.get(key[0], 0) + 1
+                inquisitor.profiling.count('planner.reused.{}'.format(key[0]))
+                return entry[2]
+        try:
+            entry[2] = function()
+            entry[1] = True
+        except Exception:
+            with self.lock:
+                del self.entries[key]
+            raise
+        finally:
+            entry[0].set()
+        return entry[2]
+
+    def clear(self):
+        # Forgets every remembered result, keeping the stats
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        # Returns how many times results of each kind were reused
+        with self.lock:
+            return sorted(self.reused.items())
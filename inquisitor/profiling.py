@@ -0,0 +1,132 @@
+import contextlib
+import cProfile
+import functools
+import json
+import threading
+import time
+
+# Whether timers and counters are recorded, off unless profiling
+ENABLED = False
+
+class Stats(object):
+
+    # Wall clock time spent in each stage of a scan along with how often it
+    # ran, failed, and counted things. Stages nest, so the time of a stage
+    # includes that of the stages it calls, and stages running on several
+    # threads at once may add up to more than the elapsed time.
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.timers = dict()
+        self.counters = dict()
+        self.start = time.time()
+
+    def record(self, stage, elapsed, failed=False):
+        with self.lock:
+            timer = self.timers.get(stage)
+            if timer is None:
+                timer = {'calls': 0, 'errors': 0, 'seconds': 0.0, 'max': 0.0}
+                self.timers[stage] = timer
+            timer['calls'] += 1
+            timer['seconds'] += elapsed
+            timer['max'] = max(timer['max'], elapsed)
+            if failed:
+                timer['errors'] += 1
+
+    def count(self, counter, amount=1):
+        with self.lock:
+            self.counters[counter] = self.counters.get(counter, 0) + amount
+
+    def table(self):
+        # Returns the rows of the summary of the timers, slowest first
+        with self.lock:
+            timers = sorted(
+                self.timers.items(),
+                key=lambda item: (-item[1]['seconds'], item[0]),
+            )
+        table = [['Stage', 'Calls', 'Errors', 'Seconds', 'Mean ms', 'Max ms']]
+        for stage, timer in timers:
+            table.append([
+                stage,
+                timer['calls'],
+                timer['errors'],
+                '{:.3f}'.format(timer['seconds']),
+                '{:.3f}'.format(timer['seconds'] * 1000 / timer['calls']),
+                '{:.3f}'.format(timer['max'] * 1000),
+            ])
+        return table
+
+    def dump(self, handle, extra=None):
+        # Writes the timers and counters as JSON
+        with self.lock:
+            stats = {
+                'elapsed': time.time() - self.start,
+                'timers': dict(
+                    (stage, dict(timer))
+                    for stage, timer in self.timers.iteritems()
+                ),
+                'counters': dict(self.counters),
+            }
+        stats.update(extra or dict())
+        json.dump(stats, handle, indent=4, sort_keys=True)
+
+STATS = Stats()
+
+def enable():
+    # Starts recording from scratch
+    global ENABLED, STATS
+    STATS = Stats()
+    ENABLED = True
+    return STATS
+
+def disable():
+    global ENABLED
+    ENABLED = False
+
+def count(counter, amount=1):
+    if ENABLED:
+        STATS.count(counter, amount)
+
+@contextlib.contextmanager
+def timer(stage):
+    # Records the time spent in the block under the stage name while enabled
+    if not ENABLED:
+        yield
+        return
+    stats = STATS
+    start = time.time()
+    try:
+        yield
+    except Exception:
+        stats.record(stage, time.time() - start, failed=True)
+        raise
+    stats.record(stage, time.time() - start)
+
+def timed(stage):
+    # Records the time spent in every call of the decorated function under
+    # the stage name while enabled
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not ENABLED:
+                return function(*args, **kwargs)
+            stats = STATS
+            start = time.time()
+            try:
+                result = function(*args, **kwargs)
+            except Exception:
+                stats.record(stage, time.time() - start, failed=True)
+                raise
+            stats.record(stage, time.time() - start)
+            return result
+        return wrapper
+    return decorator
+
+def capture(path, function, *args, **kwargs):
+    # Calls the function under cProfile, saving the statistics of the calling
+    # thread to the file for pstats to read
+    profile = cProfile.Profile()
+    try:
+        return profile.runcall(function, *args, **kwargs)
+    finally:
+        profile.dump_stats(path)
@@ -0,0 +1,115 @@
+import copy
+import msgpack
+import sys
+
+# Version of the layout of stored asset records
+VERSION = 1
+
+# Asset modules by their code in transform results, only ever appended to
+TYPES = [
+    'inquisitor.assets.registrant',
+    'inquisitor.assets.block',
+    'inquisitor.assets.host',
+    'inquisitor.assets.email',
+    'inquisitor.assets.linkedin',
+]
+TYPE_CODES = dict((name, code) for code, name in enumerate(TYPES))
+
+SCHEMAS = dict()
+
+class RecordException(Exception):
+    pass
+
+def schema(asset_type):
+    # Returns the names of the fields of the asset type in the order they
+    # are encoded in, inherited fields first
+    if asset_type not in SCHEMAS:
+        names = list()
+        for cls in reversed(asset_type.__mro__):
+            names.extend(cls.__dict__.get('__slots__', list()))
+        SCHEMAS[asset_type] = names
+    return SCHEMAS[asset_type]
+
+def default(asset_type, name):
+    return copy.copy(asset_type.DEFAULTS.get(name))
+
+def data(asset):
+    # Returns the fields of the asset as a dictionary, unset fields having
+    # their default values
+    asset_type = type(asset)
+    return dict(
+        (name, getattr(asset, name) if hasattr(asset, name)
+            else default(asset_type, name))
+        for name in schema(asset_type)
+    )
+
+def load(asset_type, fields):
+    # Builds an asset of the type from a dictionary of its fields
+    obj = asset_type.__new__(asset_type)
+    for name in schema(asset_type):
+        if name in fields:
+            setattr(obj, name, fields[name])
+        else:
+            setattr(obj, name, default(asset_type, name))
+    return obj
+
+def columns(asset_type, fields):
+    # Returns the values of the fields of an asset which storage backends
+    # may index
+    module = sys.modules[asset_type.__module__]
+    return {
+        'identifier': fields.get(module.OBJECT_ID),
+        'owned': fields.get('owned'),
+        'effective_owned': bool(fields.get('effective_owned')),
+        'registrant': fields.get('registrant'),
+        'parent': fields.get('parent'),
+    }
+
+def encode(asset):
+    # Returns the record to store for the asset, which lists the values of
+    # its fields in schema order with the types of transform results coded
+    fields = data(asset)
+    values = [VERSION]
+    for name in schema(type(asset)):
+        value = fields[name]
+        if name == 'transforms':
+            value = dict(
+                (source, [
+                    [TYPE_CODES.get(module_name, module_name), identifier]
+                    for module_name, identifier in results
+                ])
+                for source, results in value.iteritems()
+            )
+        values.append(value)
+    return msgpack.packb(values, use_bin_type=True)
+
+def decode(asset_type, record):
+    # Returns the fields of a stored record of the asset type as a dictionary
+    if isinstance(record, dict):
+        if 'data' not in record:
+            raise RecordException('Unknown record layout')
+        # Records stored before versioning held their fields as a document
+        fields = dict(record['data'])
+    else:
+        # Encoded records which happen to be valid UTF-8 may come back decoded
+        if isinstance(record, unicode):
+            record = record.encode('utf-8')
+        values = msgpack.unpackb(record, raw=False)
+        if values[0] != VERSION:
+            raise RecordException(
+                'Unsupported record version {}'.format(values[0])
+            )
+        fields = dict(zip(schema(asset_type), values[1:]))
+        fields['transforms'] = dict(
+            (source, [
+                [TYPES[code] if isinstance(code, int) else code, identifier]
+                for code, identifier in results
+            ])
+            for source, results in fields.get('transforms', dict()).iteritems()
+        )
+    for name in schema(asset_type):
+        if name not in fields:
+            fields[name] = default(asset_type, name)
+    # Empty objects are stored as empty arrays by the document layout
+    fields['transforms'] = dict(fields['transforms'] or dict())
+    return fields
@@ -0,0 +1,41 @@
+import sys
+
+def asset_key(asset):
+    asset_type = asset.__class__
+    asset_module = sys.modules[asset_type.__module__]
+    return (asset_type.__module__, getattr(asset, asset_module.OBJECT_ID))
+
+def asset_name(asset):
+    asset_type = asset.__class__
+    asset_module = sys.modules[asset_type.__module__]
+    return '{} : {}'.format(
+        asset_type.__name__,
+        getattr(asset, asset_module.OBJECT_ID)
+    )
+
+def build_tree(repository, progress=None):
+    # Acquire the parent of every owned asset in a single pass
+    owned = list(repository.iter_assets(
+        match={'effective_owned': True}
+    ))
+    children = dict()
+    for index, asset in enumerate(owned):
+        parent = asset.parent_asset(repository)
+        key = asset_key(parent) if parent else None
+        children.setdefault(key, list()).append(asset)
+        if progress:
+            progress(index + 1, len(owned))
+    # Assemble the tree from the root downwards
+    root = {'name': 'root'}
+    pending = [(root, None)]
+    while pending:
+        node, key = pending.pop()
+        if key in children:
+            node['children'] = list()
+            for child in children[key]:
+                subnode = {'name': asset_name(child)}
+                node['children'].append(subnode)
+                pending.append((subnode, asset_key(child)))
+        else:
+            node['size'] = 1
+    return root
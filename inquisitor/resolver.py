@@ -0,0 +1,112 @@
+import dns.exception
+import dns.name
+import dns.resolver
+import inquisitor.cache
+import inquisitor.concurrency
+import inquisitor.profiling
+import netaddr
+import socket
+
+# Default number of seconds allowed per DNS resolution
+TIMEOUT = 5
+
+class ResolverException(Exception):
+    pass
+
+def order(addresses):
+    # IPv4 addresses come first since they are what most lookups expect, and
+    # a stable order keeps the preferred address of a host from flapping
+    addresses = [netaddr.IPAddress(address) for address in set(addresses)]
+    return [
+        str(address) for address in
+        sorted(addresses, key=lambda a: (a.version, a.value))
+    ]
+
+class SystemResolver(object):
+
+    # Resolves A and AAAA records through the resolver of the operating
+    # system, which cannot be timed out
+    def resolve(self, host):
+        try:
+            records = socket.getaddrinfo(host, None, 0, socket.SOCK_STREAM)
+        except socket.gaierror as e:
+            if e.errno in [
+                socket.EAI_NONAME,
+                getattr(socket, 'EAI_NODATA', socket.EAI_NONAME),
+            ]:
+                return list()
+            raise ResolverException('Unable to resolve {}: {}'.format(host, e))
+        return order([
+            record[4][0] for record in records
+            if record[0] in [socket.AF_INET, socket.AF_INET6]
+        ])
+
+class DNSPythonResolver(object):
+
+    # Resolves A and AAAA records by querying nameservers directly
+    def __init__(self, nameservers=None, port=53, timeout=TIMEOUT):
+        self.resolver = dns.resolver.Resolver(configure=not nameservers)
+        if nameservers:
+            self.resolver.nameservers = list(nameservers)
+        self.resolver.port = port
+        self.resolver.timeout = timeout
+        self.resolver.lifetime = timeout
+
+    def query(self, host, rdtype):
+        try:
+            # Absolute names are never expanded with search domains
+            answer = self.resolver.query(dns.name.from_text(host), rdtype)
+        except dns.resolver.NoAnswer:
+            return list()
+        except dns.resolver.NoNameservers as e:
+            raise ResolverException('Unable to resolve {}: {}'.format(host, e))
+        except dns.exception.Timeout:
+            raise ResolverException('Timed out resolving {}'.format(host))
+        return [record.address for record in answer]
+
+    def resolve(self, host):
+        try:
+            addresses = self.query(host, 'A')
+        except dns.resolver.NXDOMAIN:
+            return list()
+        try:
+            addresses.extend(self.query(host, 'AAAA'))
+        except dns.resolver.NXDOMAIN:
+            pass
+        return order(addresses)
+
+RESOLVERS = ['system', 'dnspython']
+
+RESOLVER = SystemResolver()
+
+def configure(resolver='system', nameservers=None, port=53, timeout=None):
+    global RESOLVER
+    if resolver == 'dnspython':
+        RESOLVER = DNSPythonResolver(
+            nameservers=nameservers,
+            port=port,
+            timeout=timeout or TIMEOUT,
+        )
+    else:
+        RESOLVER = SystemResolver()
+    return RESOLVER
+
+@inquisitor.profiling.timed('dns')
+def resolve(host):
+    # Returns the IPv4 and IPv6 addresses of the host, caching names that do
+    # not resolve for a shorter time than names that do
+    responses = inquisitor.cache.RESPONSES
+    found, addresses = responses.get('dns', host)
+    if not found:
+        with inquisitor.concurrency.limit('dns'):
+            addresses = RESOLVER.resolve(host)
+        responses.put(
+            'dns',
+            host,
+            addresses,
+            ttl=None if addresses else responses.ttls.get('nxdomain'),
+        )
+    # Older caches hold a single IPv4 address per host
+    if isinstance(addresses, basestring):
+        addresses = [addresses]
+    return addresses
@@ -1,87 +1,174 @@
+import contextlib
 import googleapiclient.discovery
+import googleapiclient.errors
+import httplib2
 import inquisitor.assets.email
 import inquisitor.assets.host
 import inquisitor.assets.linkedin
 import inquisitor.assets.registrant
+import inquisitor.cache
+import inquisitor.concurrency
 import inquisitor.extractors.emails
+import inquisitor.profiling
 import logging
+import math
+import Queue
 import urlparse
 
+# Custom Search never returns more than 100 results, 10 per page
+PAGE_SIZE = 10
+MAX_PAGES = 10
+
+# Default number of seconds allowed per request
+TIMEOUT = 30
+
+def trim(item):
+    # Keeps only the fields of a result item used by transforms
+    trimmed = {'link': item.get('link'), 'snippet': item.get('snippet')}
+    people = (item.get('pagemap') or dict()).get('person')
+    if people and people[0].get('org'):
+        trimmed['pagemap'] = {'person': [{'org': people[0].get('org')}]}
+    return trimmed
+
 class GoogleAPI:
 
     def __init__(self, dev_key, cse_id, limit=None):
         self.dev_key = dev_key
         self.cse_id = cse_id
         self.limit = limit
+        self.transports = Queue.Queue()
         self.service = googleapiclient.discovery.build(
             "customsearch", "v1",
             developerKey=self.dev_key,
         )
 
+    @contextlib.contextmanager
+    def transport(self):
+        # Connections cannot be shared between threads, so each request
+        # borrows an idle one and returns it afterwards to be kept alive
+        try:
+            http = self.transports.get_nowait()
+        except Queue.Empty:
+            http = httplib2.Http(timeout=TIMEOUT)
+        try:
+            yield http
+        finally:
+            self.transports.put(http)
+
+    def page(self, query, page):
+        def lookup():
+            with self.transport() as http:
+                with inquisitor.concurrency.limit('google'):
+                    results = self.service.cse().list(
+                        q=query,
+                        cx=self.cse_id,
+                        start=(page - 1) * PAGE_SIZE + 1,
+                    ).execute(http=http)
+            information = results.get('searchInformation') or dict()
+            return {
+                'total': int(information.get('totalResults') or 0),
+                'items': [trim(item) for item in results.get('items') or list()],
+            }
+        # Results depend on the search engine as well as the query
+        return inquisitor.cache.RESPONSES.fetch(
+            'google',
+            u'{}:{}:{}'.format(self.cse_id, page, query),
+            lookup,
+        )
+
+    @inquisitor.profiling.timed('google.search')
     def search(self, query):
-        items = list()
-        page = 1
-        start = 1
-        while True:
-            if self.limit and page > self.limit:
-                break
+        pages = min(self.limit or MAX_PAGES, MAX_PAGES)
+        try:
+            first = self.page(query, 1)
+        except googleapiclient.errors.HttpError:
+            return list()
+        # The first page tells how many more pages are worth fetching
+        pages = min(pages, int(math.ceil(first['total'] / float(PAGE_SIZE))))
+        def fetch(page):
             try:
-                results = self.service.cse().list(
-                    q=query,
-                    cx=self.cse_id,
-                    start=start,
-                ).execute()
-                if results.get('items'):
-                    items.extend(results.get('items'))
-                start += 10
-                page += 1
+                return self.page(query, page)['items']
             except googleapiclient.errors.HttpError:
-                break
+                return list()
+        results = dict(inquisitor.concurrency.run_concurrently(
+            fetch,
+            range(2, pages + 1),
+            workers=max(1, pages - 1),
+        ))
+        items = list(first['items'])
+        for page in sorted(results):
+            items.extend(results[page])
+        inquisitor.profiling.count('google.pages', pages)
+        inquisitor.profiling.count('google.items', len(items))
         return items
 
-    def transform(self, repository, query):
+    def link_assets(self, repository, link, organization=None):
         assets = set()
-        items = self.search(query)
-        for item in items:
-            parsed_link = urlparse.urlparse(item['link'])
-            # Extract Host
+        parsed_link = urlparse.urlparse(link)
+        # Extract Host
+        try:
+            assets.add(repository.get_asset_string(
+                inquisitor.assets.host.Host,
+                parsed_link.netloc,
+                create=True,
+            )[1])
+        except inquisitor.assets.host.HostValidateException as e:
+            logging.error(e.message)
+        # Extract LinkedIn Accounts
+        if parsed_link.netloc.endswith('.linkedin.com'):
+            try:
+                # Create the asset
+                asset = repository.get_asset_string(
+                    inquisitor.assets.linkedin.LinkedIn,
+                    link,
+                    create=True,
+                )[1]
+                # Apply work around for acquiring the corporation
+                if organization:
+                    asset.corporation = inquisitor.assets.registrant.canonicalize(
+                        organization
+                    )
+                # Add the asset
+                assets.add(asset)
+            except inquisitor.assets.linkedin.LinkedInValidateException as e:
+                logging.error(e.message)
+        # TODO: extract accounts for other social media networks
+        return assets
+
+    def snippet_assets(self, repository, snippet):
+        assets = set()
+        # Extract Emails
+        for email in inquisitor.extractors.emails.extract(snippet):
             try:
                 assets.add(repository.get_asset_string(
-                    inquisitor.assets.host.Host,
-                    parsed_link.netloc,
+                    inquisitor.assets.email.Email,
+                    email,
                     create=True,
                 )[1])
-            except inquisitor.assets.host.HostValidateException as e:
+            except inquisitor.assets.email.EmailValidateException as e:
                 logging.error(e.message)
-            # Extract Emails
-            for email in inquisitor.extractors.emails.extract(item['snippet']):
-                try:
-                    assets.add(repository.get_asset_string(
-                        inquisitor.assets.email.Email,
-                        email,
-                        create=True,
-                    )[1])
-                except inquisitor.assets.email.EmailValidateException as e:
-                    logging.error(e.message)
-            # Extract LinkedIn Accounts
-            if parsed_link.netloc.endswith('.linkedin.com'):
-                try:
-                    # Create the asset
-                    asset = repository.get_asset_string(
-                        inquisitor.assets.linkedin.LinkedIn,
-                        item['link'],
-                        create=True,
-                    )[1]
-                    # Apply work around for acquiring the corporation
-                    if (item.get('pagemap') and
-                        item.get('pagemap').get('person') and 
-                        item.get('pagemap').get('person')[0].get('org')):
-                        asset.corporation = inquisitor.assets.registrant.canonicalize(
-                            item.get('pagemap').get('person')[0].get('org')
-                        )
-                    # Add the asset
-                    assets.add(asset)
-                except inquisitor.assets.linkedin.LinkedInValidateException as e:
-                    logging.error(e.message)
-            # TODO: extract accounts for other social media networks
-        return assets
\ No newline at end of file
+        return assets
+
+    def transform(self, repository, query, remember=None):
+        # The assets of links and snippets found by earlier queries of a
+        # scan may be remembered by its planner. Snippets depend on the query,
+        # so the same link usually comes with different snippets.
+        remember = remember or (lambda key, function: function())
+        assets = set()
+        items = self.search(query)
+        for item in items:
+            link = item['link']
+            organization = None
+            people = (item.get('pagemap') or dict()).get('person')
+            if people:
+                organization = people[0].get('org')
+            assets.update(remember(
+                ('google.link', link, organization),
+                lambda: self.link_assets(repository, link, organization),
+            ))
+            snippet = item['snippet']
+            assets.update(remember(
+                ('google.snippet', snippet),
+                lambda: self.snippet_assets(repository, snippet),
+            ))
+        return assets
@@ -1,8 +1,49 @@
 import inquisitor.assets.host
 import inquisitor.assets.registrant
+import inquisitor.concurrency
+import inquisitor.profiling
 import logging
+import math
 import shodan
 
+# Shodan serves search results 100 per page
+PAGE_SIZE = 100
+
+# Number of pages fetched at once if the number of concurrent requests to
+# Shodan is unlimited
+PAGE_WORKERS = 4
+
+# The properties of a result read by transforms
+FIELDS = [
+    'ip_str',
+    'port',
+    'isp',
+    'org',
+    'hostnames',
+    'domains',
+    'http.host',
+    '_shodan.options.hostname',
+]
+
+def trim(item):
+    # Keeps only the properties of a result read by transforms
+    trimmed = {
+        'isp': item.get('isp'),
+        'org': item.get('org'),
+        'hostnames': item.get('hostnames') or list(),
+        'domains': item.get('domains') or list(),
+    }
+    if (item.get('http') or dict()).get('host'):
+        trimmed['http'] = {'host': item['http']['host']}
+    options = (item.get('_shodan') or dict()).get('options') or dict()
+    if options.get('hostname'):
+        trimmed['_shodan'] = {'options': {'hostname': options['hostname']}}
+    # Identifies the banner across queries
+    if item.get('ip_str'):
+        trimmed['ip_str'] = item['ip_str']
+        trimmed['port'] = item.get('port')
+    return trimmed
+
 class ShodanAPI:
 
     def __init__(self, api_key, limit=None):
@@ -10,81 +51,114 @@ class ShodanAPI:
         self.service = shodan.Shodan(self.api_key)
         self.limit = limit
 
+    def page(self, query, page):
+        with inquisitor.concurrency.limit('shodan'):
+            results = self.service.search(
+                query,
+                page=page,
+                minify=False,
+                fields=FIELDS,
+            )
+        return [trim(item) for item in results.get('matches') or list()]
+
+    @inquisitor.profiling.timed('shodan.search')
     def search(self, query):
-        page = 1
+        # Counting costs no query credits and tells how many pages to fetch
+        with inquisitor.concurrency.limit('shodan'):
+            total = self.service.count(query)['total']
+        pages = int(math.ceil(total / float(PAGE_SIZE)))
+        if self.limit:
+            pages = min(pages, self.limit)
+        # Pages are requested no faster than the limiter allows, so there is
+        # no use for more threads than it lets through at once
+        limiter = inquisitor.concurrency.limit('shodan')
+        results = dict(inquisitor.concurrency.run_concurrently(
+            lambda page: self.page(query, page),
+            range(1, pages + 1),
+            workers=min(pages, limiter.concurrency or PAGE_WORKERS),
+        ))
         items = list()
-        while True:
-            if self.limit and page > self.limit:
-                break
-            results = self.service.search(query, page=page)
-            if results.get('matches'):
-                items.extend(results.get('matches'))
-            if len(items) >= results['total']:
-                break
-            page += 1
+        for page in sorted(results):
+            items.extend(results[page])
+        inquisitor.profiling.count('shodan.pages', pages)
+        inquisitor.profiling.count('shodan.items', len(items))
         return items
-                
-    def transform(self, repository, query):
+
+    def item_assets(self, repository, item):
         assets = set()
-        items = self.search(query)
-        for item in items:
-            # Extract ISP Registrant
+        # Extract ISP Registrant
+        try:
+            assets.add(repository.get_asset_string(
+                inquisitor.assets.registrant.Registrant,
+                item['isp'],
+                create=True,
+            )[1])
+        except inquisitor.assets.registrant.RegistrantValidateException as e:
+            logging.error(e.message)
+        # Extract Organization Registrant
+        try:
+            assets.add(repository.get_asset_string(
+                inquisitor.assets.registrant.Registrant,
+                item['org'],
+                create=True,
+            )[1])
+        except inquisitor.assets.registrant.RegistrantValidateException as e:
+            logging.error(e.message)
+        # Extract Host From Options
+        if (item.get('_shodan') and item.get('_shodan').get('options') and 
+            item.get('_shodan').get('options').get('hostname')):
+            try:
+                assets.add(repository.get_asset_string(
+                    inquisitor.assets.host.Host,
+                    item['_shodan']['options']['hostname'],
+                    create=True,
+                )[1])
+            except inquisitor.assets.host.HostValidateException as e:
+                logging.error(e.message)
+        # Extract Host From HTTP
+        if item.get('http') and item.get('http').get('host'):
             try:
                 assets.add(repository.get_asset_string(
-                    inquisitor.assets.registrant.Registrant,
-                    item['isp'],
+                    inquisitor.assets.host.Host,
+                    item['http']['host'],
                     create=True,
                 )[1])
-            except inquisitor.assets.registrant.RegistrantValidateException as e:
+            except inquisitor.assets.host.HostValidateException as e:
                 logging.error(e.message)
-            # Extract Organization Registrant
+        # Extract Hosts From Hostnames
+        for host in item['hostnames']:
             try:
                 assets.add(repository.get_asset_string(
-                    inquisitor.assets.registrant.Registrant,
-                    item['org'],
+                    inquisitor.assets.host.Host,
+                    host,
                     create=True,
                 )[1])
-            except inquisitor.assets.registrant.RegistrantValidateException as e:
+            except inquisitor.assets.host.HostValidateException as e:
                 logging.error(e.message)
-            # Extract Host From Options
-            if (item.get('_shodan') and item.get('_shodan').get('options') and 
-                item.get('_shodan').get('options').get('hostname')):
-                try:
-                    assets.add(repository.get_asset_string(
-                        inquisitor.assets.host.Host,
-                        item['_shodan']['options']['hostname'],
-                        create=True,
-                    )[1])
-                except inquisitor.assets.host.HostValidateException as e:
-                    logging.error(e.message)
-            # Extract Host From HTTP
-            if item.get('http') and item.get('http').get('host'):
-                try:
-                    assets.add(repository.get_asset_string(
-                        inquisitor.assets.host.Host,
-                        item['http']['host'],
-                        create=True,
-                    )[1])
-                except inquisitor.assets.host.HostValidateException as e:
-                    logging.error(e.message)
-            # Extract Hosts From Hostnames
-            for host in item['hostnames']:
-                try:
-                    assets.add(repository.get_asset_string(
-                        inquisitor.assets.host.Host,
-                        host,
-                        create=True,
-                    )[1])
-                except inquisitor.assets.host.HostValidateException as e:
-                    logging.error(e.message)
-            # Extract Hosts From Domains
-            for host in item['domains']:
-                try:
-                    assets.add(repository.get_asset_string(
-                        inquisitor.assets.host.Host,
-                        host,
-                        create=True,
-                    )[1])
-                except inquisitor.assets.host.HostValidateException as e:
-                    logging.error(e.message)
+        # Extract Hosts From Domains
+        for host in item['domains']:
+            try:
+                assets.add(repository.get_asset_string(
+                    inquisitor.assets.host.Host,
+                    host,
+                    create=True,
+                )[1])
+            except inquisitor.assets.host.HostValidateException as e:
+                logging.error(e.message)
+        return assets
+
+    def transform(self, repository, query, remember=None):
+        # The assets of banners found by earlier queries of a scan may be
+        # remembered by its planner
+        remember = remember or (lambda key, function: function())
+        assets = set()
+        items = self.search(query)
+        for item in items:
+            if not item.get('ip_str'):
+                assets.update(self.item_assets(repository, item))
+                continue
+            assets.update(remember(
+                ('shodan.banner', item['ip_str'], item.get('port')),
+                lambda: self.item_assets(repository, item),
+            ))
         return assets
\ No newline at end of file
@@ -0,0 +1,397 @@
+import os
+import sqlite3
+import unqlite
+
+# Columns of the stored assets which backends may index
+COLUMNS = ['identifier', 'owned', 'effective_owned', 'registrant', 'parent']
+
+SQLITE_HEADER = 'SQLite format 3\x00'
+SQLITE_EXTENSIONS = ['.sqlite', '.sqlite3']
+
+# Number of records read at once while iterating over SQLite databases
+SQLITE_CHUNK = 1000
+
+class StorageException(Exception):
+    pass
+
+class Storage(object):
+
+    # Interface of the databases behind intelligence repositories. Assets of
+    # each kind are stored as encoded records along with their indexable
+    # columns, next to a key-value store for everything else. Writes belong
+    # to an implicit transaction until they are committed.
+
+    # Columns by which identifiers are found without scanning other records
+    LOOKUP_COLUMNS = []
+
+    def exists(self, key):
+        raise NotImplementedError()
+
+    def __getitem__(self, key):
+        raise NotImplementedError()
+
+    def __setitem__(self, key, value):
+        raise NotImplementedError()
+
+    def __delitem__(self, key):
+        raise NotImplementedError()
+
+    def match_prefix(self, prefix):
+        # Returns the (key, value) pairs whose key starts with the prefix
+        raise NotImplementedError()
+
+    def create(self, kind):
+        raise NotImplementedError()
+
+    def count(self, kind):
+        raise NotImplementedError()
+
+    def store(self, kind, record, columns):
+        # Stores a new record, returning its id
+        raise NotImplementedError()
+
+    def update(self, kind, __id, record, columns):
+        raise NotImplementedError()
+
+    def fetch(self, kind, __id):
+        # Returns the record with the id, or None if there is none
+        raise NotImplementedError()
+
+    def records(self, kind, match=None):
+        # Yields the (id, record) pairs of the kind in the order they were
+        # stored. Records whose columns do not have the matched values may
+        # be skipped, but need not be.
+        raise NotImplementedError()
+
+    def index(self, kind, identifier, __id):
+        # Maps the identifier to the id of its record
+        raise NotImplementedError()
+
+    def lookup(self, kind, identifier):
+        # Returns the id of the record the identifier maps to, if any. The
+        # record may have a different identifier if the mapping is stale.
+        raise NotImplementedError()
+
+    def identifiers(self, kind, column, value):
+        # Returns the identifiers of the records of the kind whose column,
+        # one of the lookup columns, has the value
+        raise NotImplementedError()
+
+    def drop_index(self):
+        raise NotImplementedError()
+
+    def begin(self):
+        raise NotImplementedError()
+
+    def commit(self):
+        raise NotImplementedError()
+
+    def rollback(self):
+        # Discards every uncommitted write
+        raise NotImplementedError()
+
+    def close(self):
+        # Commits every pending write
+        raise NotImplementedError()
+
+class UnQLiteStorage(Storage):
+
+    # Stores every kind of asset in a collection of its own, looking records
+    # up through index entries in the key-value store
+    INDEX_PREFIX = 'index:'
+    # Collections hold the encoded record under this field
+    FIELD = 'r'
+
+    def __init__(self, path):
+        self.database = unqlite.UnQLite(path)
+        self.collections = dict()
+
+    def exists(self, key):
+        return self.database.exists(key)
+
+    def __getitem__(self, key):
+        return self.database[key]
+
+    def __setitem__(self, key, value):
+        self.database[key] = value
+
+    def __delitem__(self, key):
+        del self.database[key]
+
+    def match_prefix(self, prefix):
+        return self.database.match_prefix(prefix)
+
+    def create(self, kind):
+        collection = self.database.collection(kind)
+        collection.create()
+        self.collections[kind] = collection
+
+    def count(self, kind):
+        return len(self.collections[kind])
+
+    def unwrap(self, document):
+        # Records stored before they were encoded are documents of their own
+        if self.FIELD in document:
+            return document[self.FIELD]
+        document = dict(document)
+        document.pop('__id', None)
+        return document
+
+    def store(self, kind, record, columns):
+        return self.collections[kind].store({self.FIELD: record})
+
+    def update(self, kind, __id, record, columns):
+        self.collections[kind].update(__id, {self.FIELD: record})
+
+    def fetch(self, kind, __id):
+        document = self.collections[kind].fetch(__id)
+        return self.unwrap(document) if document else None
+
+    def records(self, kind, match=None):
+        # Records can only be matched once decoded
+        documents = iter(self.collections[kind].iterator())
+        for document in documents:
+            yield (document['__id'], self.unwrap(document))
+
+    def index_key(self, kind, identifier):
+        if isinstance(identifier, str):
+            identifier = identifier.decode('utf-8')
+        key = u'{}{}:{}'.format(self.INDEX_PREFIX, kind, identifier)
+        return key.encode('utf-8')
+
+    def index(self, kind, identifier, __id):
+        self.database[self.index_key(kind, identifier)] = str(__id)
+
+    def lookup(self, kind, identifier):
+        key = self.index_key(kind, identifier)
+        if not self.database.exists(key):
+            return None
+        return int(self.database[key])
+
+    def drop_index(self):
+        stale = [key for key, value in self.match_prefix(self.INDEX_PREFIX)]
+        for key in stale:
+            del self.database[key]
+
+    def begin(self):
+        self.database.begin()
+
+    def commit(self):
+        self.database.commit()
+
+    def rollback(self):
+        self.database.rollback()
+
+    def close(self):
+        self.database.close()
+
+class SQLiteStorage(Storage):
+
+    # Stores every asset in a single table with indexes on its columns so
+    # that lookups and matches never scan other records. The write-ahead log
+    # lets other processes read the database while it is being written to.
+    SCHEMA = [
+        'CREATE TABLE IF NOT EXISTS kv ('
+        'key TEXT PRIMARY KEY, '
+        'value BLOB)',
+        'CREATE TABLE IF NOT EXISTS assets ('
+        'id INTEGER PRIMARY KEY, '
+        'type TEXT NOT NULL, '
+        'identifier TEXT NOT NULL, '
+        'owned INTEGER, '
+        'effective_owned INTEGER NOT NULL, '
+        'registrant TEXT, '
+        'parent TEXT, '
+        'record BLOB NOT NULL)',
+        'CREATE UNIQUE INDEX IF NOT EXISTS assets_identifier '
+        'ON assets (type, identifier)',
+        'CREATE INDEX IF NOT EXISTS assets_owned '
+        'ON assets (type, owned)',
+        'CREATE INDEX IF NOT EXISTS assets_effective_owned '
+        'ON assets (type, effective_owned)',
+        'CREATE INDEX IF NOT EXISTS assets_registrant '
+        'ON assets (registrant)',
+        'CREATE INDEX IF NOT EXISTS assets_parent '
+        'ON assets (parent)',
+    ]
+    LOOKUP_COLUMNS = ['registrant', 'parent']
+
+    def __init__(self, path):
+        # Transactions are managed explicitly, every write outside of one
+        # being committed on its own. Access is serialized by the repository
+        # across threads.
+        self.connection = sqlite3.connect(
+            path,
+            isolation_level=None,
+            check_same_thread=False,
+        )
+        self.connection.text_factory = str
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        for statement in self.SCHEMA:
+            self.connection.execute(statement)
+        self.transaction = False
+
+    def query(self, statement, parameters=()):
+        return self.connection.execute(statement, parameters).fetchall()
+
+    def write(self, statement, parameters=()):
+        return self.connection.execute(statement, parameters)
+
+    def exists(self, key):
+        return bool(self.query('SELECT 1 FROM kv WHERE key = ?', (key,)))
+
+    def __getitem__(self, key):
+        rows = self.query('SELECT value FROM kv WHERE key = ?', (key,))
+        if not rows:
+            raise KeyError(key)
+        return str(rows[0][0])
+
+    def __setitem__(self, key, value):
+        self.write('INSERT OR REPLACE INTO kv VALUES (?, ?)', (key, value))
+
+    def __delitem__(self, key):
+        self.write('DELETE FROM kv WHERE key = ?', (key,))
+
+    def match_prefix(self, prefix):
+        # Keys are UTF-8 encoded, which never contains the upper bound byte
+        return [
+            (key, str(value)) for key, value in self.query(
+                'SELECT key, value FROM kv WHERE key >= ? AND key < ? '
+                'ORDER BY key',
+                (prefix, prefix + '\xff'),
+            )
+        ]
+
+    def create(self, kind):
+        pass
+
+    def count(self, kind):
+        return self.query(
+            'SELECT COUNT(*) FROM assets WHERE type = ?', (kind,)
+        )[0][0]
+
+    def values(self, columns):
+        return [
+            columns.get('identifier'),
+            columns.get('owned'),
+            bool(columns.get('effective_owned')),
+            columns.get('registrant'),
+            columns.get('parent'),
+        ]
+
+    def store(self, kind, record, columns):
+        cursor = self.write(
+            'INSERT INTO assets (type, identifier, owned, effective_owned, '
+            'registrant, parent, record) VALUES (?, ?, ?, ?, ?, ?, ?)',
+            [kind] + self.values(columns) + [sqlite3.Binary(record)],
+        )
+        return cursor.lastrowid
+
+    def update(self, kind, __id, record, columns):
+        self.write(
+            'UPDATE assets SET identifier = ?, owned = ?, '
+            'effective_owned = ?, registrant = ?, parent = ?, record = ? '
+            'WHERE id = ? AND type = ?',
+            self.values(columns) + [sqlite3.Binary(record), __id, kind],
+        )
+
+    def fetch(self, kind, __id):
+        rows = self.query(
+            'SELECT record FROM assets WHERE id = ? AND type = ?',
+            (__id, kind),
+        )
+        return str(rows[0][0]) if rows else None
+
+    def records(self, kind, match=None):
+        conditions = ['type = ?']
+        parameters = [kind]
+        for column, value in sorted((match or dict()).iteritems()):
+            if column not in COLUMNS:
+                raise StorageException('Unknown column {}'.format(column))
+            if value is None:
+                conditions.append('{} IS NULL'.format(column))
+            else:
+                conditions.append('{} = ?'.format(column))
+                parameters.append(value)
+        # Records are read in chunks so that no statement is left running
+        # while the caller writes in between
+        last = -1
+        while True:
+            rows = self.query(
+                'SELECT id, record FROM assets WHERE {} AND id > ? '
+                'ORDER BY id LIMIT ?'.format(' AND '.join(conditions)),
+                parameters + [last, SQLITE_CHUNK],
+            )
+            for __id, record in rows:
+                yield (__id, str(record))
+            if len(rows) < SQLITE_CHUNK:
+                break
+            last = rows[-1][0]
+
+    # Identifiers are always indexed by the assets table
+    def index(self, kind, identifier, __id):
+        pass
+
+    def lookup(self, kind, identifier):
+        rows = self.query(
+            'SELECT id FROM assets WHERE type = ? AND identifier = ?',
+            (kind, identifier),
+        )
+        return rows[0][0] if rows else None
+
+    def identifiers(self, kind, column, value):
+        if column not in self.LOOKUP_COLUMNS:
+            raise StorageException('Unknown column {}'.format(column))
+        return [
+            identifier for identifier, in self.query(
+                'SELECT identifier FROM assets WHERE {} = ? AND type = ?'
+                .format(column),
+                (value, kind),
+            )
+        ]
+
+    def drop_index(self):
+        pass
+
+    def begin(self):
+        self.commit()
+        self.connection.execute('BEGIN')
+        self.transaction = True
+
+    def commit(self):
+        if self.transaction:
+            self.connection.execute('COMMIT')
+            self.transaction = False
+
+    def rollback(self):
+        if self.transaction:
+            self.connection.execute('ROLLBACK')
+            self.transaction = False
+
+    def close(self):
+        self.commit()
+        self.connection.close()
+
+BACKENDS = {
+    'unqlite': UnQLiteStorage,
+    'sqlite': SQLiteStorage,
+}
+
+def backend(path):
+    # Existing databases are opened with the backend that created them and
+    # new ones with SQLite if named like SQLite databases
+    if os.path.isfile(path) and os.path.getsize(path):
+        with open(path, 'rb') as handle:
+            header = handle.read(len(SQLITE_HEADER))
+        return 'sqlite' if header == SQLITE_HEADER else 'unqlite'
+    extension = os.path.splitext(path)[1].lower()
+    return 'sqlite' if extension in SQLITE_EXTENSIONS else 'unqlite'
+
+def connect(path, backend_name=None):
+    backend_name = backend_name or backend(path)
+    if backend_name not in BACKENDS:
+        raise StorageException(
+            'Unknown storage backend {}'.format(backend_name)
+        )
+    return BACKENDS[backend_name](path)
@@ -11,8 +11,11 @@ config = {
     'author_email': 'penafieljlm@gmail.com',
     'version': '0.1',
     'install_requires': [
+        'dnspython',
         'google-api-python-client',
         'ipwhois',
+        # Later versions lack the C extension on Python 2
+        'msgpack<1.0',
         'netaddr',
         'nose',
         'python-whois',
@@ -0,0 +1,166 @@
+from nose.tools import *
+import inquisitor.cache
+import os
+import shutil
+import tempfile
+
+def setup():
+    global directory
+    directory = tempfile.mkdtemp()
+
+def teardown():
+    shutil.rmtree(directory)
+
+def test_fetch_hit_and_miss():
+    cache = inquisitor.cache.ResponseCache()
+    calls = list()
+    def lookup():
+        calls.append(1)
+        return '192.0.2.1'
+    assert_equal(cache.fetch('dns', 'example.com', lookup), '192.0.2.1')
+    assert_equal(cache.fetch('dns', 'example.com', lookup), '192.0.2.1')
+    assert_equal(len(calls), 1)
+    assert_equal(cache.stats(), [['dns', 1, 1]])
+
+def test_expiry_and_eviction():
+    cache = inquisitor.cache.ResponseCache(ttls={'dns': -1, 'rdap': 60})
+    cache.put('dns', 'example.com', '192.0.2.1')
+    cache.put('rdap', '192.0.2.1', {'network': {'cidr': '192.0.2.0/24'}})
+    assert_equal(cache.evict(), 1)
+    assert_equal(cache.get('dns', 'example.com'), (False, None))
+    assert_equal(
+        cache.get('rdap', '192.0.2.1'),
+        (True, {'network': {'cidr': '192.0.2.0/24'}}),
+    )
+
+@raises(IOError)
+def test_failures_not_cached():
+    cache = inquisitor.cache.ResponseCache()
+    def lookup():
+        raise IOError('Lookup failed')
+    try:
+        cache.fetch('whois', 'example.com', lookup)
+    finally:
+        assert_equal(cache.get('whois', 'example.com'), (False, None))
+
+def test_persistence_and_refresh():
+    path = os.path.join(directory, 'responses.cache')
+    cache = inquisitor.cache.ResponseCache(path)
+    cache.put('dns', 'example.com', '192.0.2.1')
+    cache.close()
+    cache = inquisitor.cache.ResponseCache(path)
+    assert_equal(cache.get('dns', 'example.com'), (True, '192.0.2.1'))
+    cache.close()
+    cache = inquisitor.cache.ResponseCache(path, refresh=True)
+    assert_equal(cache.get('dns', 'example.com'), (False, None))
+    cache.close()
+
+def test_network_longest_match():
+    cache = inquisitor.cache.ResponseCache()
+    cache.put_network('10.0.0.0/8', 'large')
+    cache.put_network('10.1.0.0/16', 'small')
+    assert_equal(cache.get_network('10.1.2.3'), (True, 'small'))
+    assert_equal(cache.get_network('10.2.0.1'), (True, 'large'))
+    assert_equal(cache.get_network('192.0.2.1'), (False, None))
+
+def test_network_persistence_and_eviction():
+    path = os.path.join(directory, 'networks.cache')
+    cache = inquisitor.cache.ResponseCache(path)
+    cache.put_network('192.0.2.0/24', 'kept')
+    cache.close()
+    cache = inquisitor.cache.ResponseCache(path, ttls={'network': -1})
+    assert_equal(cache.get_network('192.0.2.1'), (True, 'kept'))
+    cache.put_network('198.51.100.0/24', 'expired')
+    assert_equal(cache.evict(), 1)
+    assert_equal(cache.get_network('198.51.100.1'), (False, None))
+    cache.close()
+
+def test_rdap_reuses_covering_network():
+    import inquisitor.assets.block
+    import ipwhois.ipwhois
+    calls = list()
+    class IPWhois(object):
+        def __init__(self, ip):
+            calls.append(ip)
+        def lookup_rdap(self):
+            return {'network': {'cidr': '203.0.113.0/25, 203.0.113.128/26'}}
+    original = ipwhois.ipwhois.IPWhois
+    ipwhois.ipwhois.IPWhois = IPWhois
+    inquisitor.cache.configure()
+    try:
+        for ip in ['203.0.113.1', '203.0.113.100', '203.0.113.130']:
+            assert_equal(
+                inquisitor.assets.block.rdap(ip)['network']['cidr'],
+                '203.0.113.0/25, 203.0.113.128/26',
+            )
+        inquisitor.assets.block.rdap('203.0.113.200')
+    finally:
+        ipwhois.ipwhois.IPWhois = original
+        inquisitor.cache.configure()
+    assert_equal(calls, ['203.0.113.1', '203.0.113.200'])
+
+def test_rdap_block_needs_exact_network():
+    import inquisitor.assets.block
+    import ipwhois.ipwhois
+    networks = {
+        '203.0.113.0': '203.0.113.0/24',
+        '203.0.113.64': '203.0.113.64/26',
+    }
+    calls = list()
+    class IPWhois(object):
+        def __init__(self, ip):
+            calls.append(ip)
+            self.ip = ip
+        def lookup_rdap(self):
+            return {
+                'network': {'cidr': networks[self.ip]},
+                'objects': {'owner': {
+                    'roles': ['registrant'],
+                    'contact': {'kind': 'org', 'name': networks[self.ip]},
+                }},
+            }
+    original = ipwhois.ipwhois.IPWhois
+    ipwhois.ipwhois.IPWhois = IPWhois
+    inquisitor.cache.configure()
+    try:
+        blocks = [
+            inquisitor.assets.block.Block('203.0.113.0/24'),
+            inquisitor.assets.block.Block('203.0.113.64/26'),
+            inquisitor.assets.block.Block('203.0.113.0/24'),
+        ]
+        for block in blocks:
+            block.enrich_registrant()
+    finally:
+        ipwhois.ipwhois.IPWhois = original
+        inquisitor.cache.configure()
+    # The sub-block is not given the answer of the network covering it
+    assert_equal(
+        [block.registrant for block in blocks],
+        ['203.0.113.0/24', '203.0.113.64/26', '203.0.113.0/24'],
+    )
+    assert_equal(calls, ['203.0.113.0', '203.0.113.64'])
+
+def test_memoize():
+    calls = list()
+    @inquisitor.cache.memoize(errors=ValueError, size=2)
+    def canonicalize(value):
+        calls.append(value)
+        if not value.strip():
+            raise ValueError('Empty value')
+        return value.strip().lower()
+    assert_equal(canonicalize(' A '), 'a')
+    assert_equal(canonicalize(' A '), 'a')
+    assert_equal(calls, [' A '])
+    # Validation failures are remembered too
+    for i in range(2):
+        with assert_raises(ValueError):
+            canonicalize(' ')
+    assert_equal(calls, [' A ', ' '])
+    # The least recently used value is forgotten beyond the size
+    canonicalize('B')
+    canonicalize(' A ')
+    assert_equal(calls, [' A ', ' ', 'B', ' A '])
+    assert_equal(len(canonicalize.memo), 2)
+    # Values that cannot be remembered are passed through
+    with assert_raises(AttributeError):
+        canonicalize(None)
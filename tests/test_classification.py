@@ -0,0 +1,47 @@
+from nose.tools import *
+import inquisitor.assets.host
+import inquisitor.classification
+
+def test_verdicts():
+    assert_true(inquisitor.classification.verdict('Accept'))
+    assert_is_none(inquisitor.classification.verdict(' unknown '))
+    assert_false(inquisitor.classification.verdict('rejected'))
+    assert_false(inquisitor.classification.verdict(False))
+    with assert_raises(inquisitor.classification.ClassificationException):
+        inquisitor.classification.verdict('maybe')
+
+def test_asset_types():
+    for name in ['host', 'Host', 'hosts']:
+        assert_is(
+            inquisitor.classification.asset_module(name),
+            inquisitor.assets.host,
+        )
+    with assert_raises(inquisitor.classification.ClassificationException):
+        inquisitor.classification.asset_module('server')
+
+def test_load_csv_and_ndjson():
+    assets = inquisitor.classification.load([
+        'type,identifier,verdict\n',
+        'registrant,"Acme, Inc.",accept\n',
+        'block,10.0.0.0/8,reject\n',
+        '\n',
+        '{"type": "hosts", "identifier": "WWW.Example.com", "verdict": null}\n',
+        'block,10.0.0.0/8,accept\n',
+        'host,not a host,accept\n',
+        'registrant,Acme\n',
+    ])
+    assert_equal(
+        sorted(
+            (type(a).__name__, getattr(a,
+                inquisitor.classification.asset_module(
+                    type(a).__name__
+                ).OBJECT_ID
+            ), a.owned)
+            for a in assets
+        ),
+        [
+            ('Block', '10.0.0.0/8', True),
+            ('Host', 'www.example.com', None),
+            ('Registrant', 'ACME, INC.', True),
+        ],
+    )
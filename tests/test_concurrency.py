@@ -0,0 +1,37 @@
+from nose.tools import *
+import inquisitor.concurrency
+import threading
+import time
+
+def test_token_bucket_rate():
+    bucket = inquisitor.concurrency.TokenBucket(20, capacity=1)
+    start = time.time()
+    for index in range(6):
+        bucket.consume()
+    # The first token is available immediately, the rest at 20 per second
+    assert_greater_equal(time.time() - start, 0.2)
+
+def test_limiter_concurrency():
+    limiter = inquisitor.concurrency.Limiter(concurrency=2)
+    active = [0, 0]
+    lock = threading.Lock()
+    def work(item):
+        with limiter:
+            with lock:
+                active[0] += 1
+                active[1] = max(active[1], active[0])
+            time.sleep(0.01)
+            with lock:
+                active[0] -= 1
+        return item * 2
+    results = dict(inquisitor.concurrency.run_concurrently(
+        work, range(10), workers=5
+    ))
+    assert_equal(results, dict((i, i * 2) for i in range(10)))
+    assert_less_equal(active[1], 2)
+
+@raises(ValueError)
+def test_run_concurrently_error():
+    def work(item):
+        raise ValueError(item)
+    list(inquisitor.concurrency.run_concurrently(work, [1, 2], workers=2))
@@ -0,0 +1,104 @@
+from nose.tools import *
+import gzip
+import inquisitor
+import inquisitor.assets.host
+import inquisitor.assets.registrant
+import json
+import os
+import shutil
+import tempfile
+
+Host = inquisitor.assets.host.Host
+Registrant = inquisitor.assets.registrant.Registrant
+
+def load_script():
+    # The inq script has no extension, so it is executed from its source
+    path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'inq')
+    script = dict(__name__='inq_script', __file__=path)
+    with open(path) as handle:
+        exec compile(handle.read(), path, 'exec') in script
+    return script
+
+def setup():
+    global directory, inq
+    directory = tempfile.mkdtemp()
+    inq = load_script()
+
+def teardown():
+    shutil.rmtree(directory)
+
+def open_repository(name):
+    repository = inquisitor.IntelligenceRepository(
+        os.path.join(directory, name)
+    )
+    repository.put_asset_string(Registrant, 'Acme Corp', owned=True)
+    repository.put_asset_string(Registrant, 'Other Corp', owned=False)
+    return repository
+
+def read_ndjson(path, compress=False):
+    with (gzip.open(path) if compress else open(path)) as handle:
+        return [json.loads(line) for line in handle]
+
+def test_dump_json():
+    repository = open_repository('json.db')
+    path = os.path.join(directory, 'json.json')
+    inq['dump'](repository, path, True)
+    with open(path) as handle:
+        registrants = json.load(handle)['registrants']
+    assert_equal(
+        [(r['registrant'], r['owned'], r['strong_owned']) for r in registrants],
+        [('ACME CORP', True, True), ('OTHER CORP', False, False)],
+    )
+    # Internal bookkeeping is left out
+    for registrant in registrants:
+        assert_not_in('enriched', registrant)
+        assert_not_in('revision', registrant)
+
+def test_dump_ndjson_gzip():
+    repository = open_repository('gzip.db')
+    path = os.path.join(directory, 'gzip.ndjson.gz')
+    inq['dump_ndjson'](repository, path, False, compress=True)
+    assert_equal(
+        [(e['type'], e['registrant']) for e in read_ndjson(path, True)],
+        [('registrants', 'ACME CORP')],
+    )
+
+def test_dump_ndjson_split():
+    repository = open_repository('split.db')
+    repository.put_asset_string(Host, 'www.acme.com', owned=True)
+    path = os.path.join(directory, 'split')
+    inq['dump_ndjson'](repository, path, True, split=True)
+    assert_equal(
+        sorted(os.listdir(path)),
+        sorted('{}.ndjson'.format(module.REPOSITORY)
+            for module in inquisitor.ASSET_MODULES),
+    )
+    assert_equal(
+        [e['registrant'] for e in read_ndjson(
+            os.path.join(path, 'registrants.ndjson')
+        )],
+        ['ACME CORP', 'OTHER CORP'],
+    )
+    # Parent domains are stored along with their hosts
+    assert_equal(
+        sorted(e['host'] for e in read_ndjson(
+            os.path.join(path, 'hosts.ndjson')
+        )),
+        ['acme.com', 'www.acme.com'],
+    )
+
+def test_dump_ndjson_since():
+    repository = open_repository('since.db')
+    path = os.path.join(directory, 'since.ndjson')
+    checkpoint = os.path.join(directory, 'since.checkpoint')
+    inq['dump_ndjson'](repository, path, True, since=checkpoint)
+    assert_equal(len(read_ndjson(path)), 2)
+    # Only assets stored after the checkpoint are dumped again
+    inq['dump_ndjson'](repository, path, True, since=checkpoint)
+    assert_equal(read_ndjson(path), list())
+    repository.put_asset_string(Registrant, 'New Corp', owned=True)
+    inq['dump_ndjson'](repository, path, True, since=checkpoint)
+    assert_equal(
+        [e['registrant'] for e in read_ndjson(path)],
+        ['NEW CORP'],
+    )
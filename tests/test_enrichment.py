@@ -0,0 +1,90 @@
+from nose.tools import *
+import inquisitor
+import inquisitor.assets
+import inquisitor.assets.block
+import inquisitor.assets.host
+import inquisitor.enrichment
+import inquisitor.resolver
+import ipwhois.exceptions
+import time
+
+class Slow(inquisitor.assets.Asset):
+
+    def __init__(self, name, delay):
+        super(Slow, self).__init__()
+        self.name = name
+        self.delay = delay
+        self.resolved = False
+        self.looked_up = False
+
+    def enrichment_steps(self):
+        return [[self.resolve], [self.lookup]]
+
+    def resolve(self):
+        time.sleep(self.delay)
+        self.resolved = True
+
+    def lookup(self):
+        # Later stages only start once every earlier stage has completed
+        self.looked_up = self.resolved
+
+def test_enrich_concurrently():
+    assets = [Slow(str(index), 0.1) for index in range(10)]
+    start = time.time()
+    inquisitor.enrichment.enrich(assets, workers=10, timeout=5)
+    assert_less(time.time() - start, 0.5)
+    assert_true(all(asset.looked_up for asset in assets))
+
+def test_enrich_timeout():
+    assets = [Slow('slow', 1), Slow('fast', 0)]
+    inquisitor.enrichment.enrich(assets, workers=2, timeout=0.2)
+    assert_false(assets[0].resolved)
+    assert_true(assets[1].looked_up)
+    assert_equal(
+        inquisitor.enrichment.describe(assets[0].resolve),
+        '{}: Slow: resolve'.format(Slow.__module__),
+    )
+    # Assets whose lookups are abandoned are replaced by copies
+    enriched = inquisitor.enrichment.enrich(
+        [Slow('slow', 1), Slow('fast', 0)],
+        workers=2,
+        timeout=0.2,
+    )
+    assert_not_in('resolved', enriched[0].__dict__)
+    assert_true(enriched[1].looked_up)
+
+def test_enrich_failed_lookup():
+    originals = (
+        inquisitor.resolver.resolve,
+        inquisitor.assets.host.whois_lookup,
+        inquisitor.assets.block.rdap,
+    )
+    def whois_lookup(host):
+        raise Exception('No match for {}'.format(host))
+    def rdap(ip):
+        raise ipwhois.exceptions.IPDefinedError('Reserved')
+    inquisitor.resolver.resolve = lambda host: ['192.0.2.1']
+    inquisitor.assets.host.whois_lookup = whois_lookup
+    inquisitor.assets.block.rdap = rdap
+    try:
+        host = inquisitor.assets.host.Host('www.unknown.com')
+        host, = inquisitor.enrichment.enrich([host])
+    finally:
+        (
+            inquisitor.resolver.resolve,
+            inquisitor.assets.host.whois_lookup,
+            inquisitor.assets.block.rdap,
+        ) = originals
+    # The failed lookup leaves its fields as they were
+    assert_true(host.enriched)
+    assert_equal(host.ip, '192.0.2.1')
+    assert_equal(host.emails, list())
+    assert_equal(host.nameservers, list())
+    repository = inquisitor.IntelligenceRepository(':mem:')
+    repository.put_asset_object(host)
+    __id, stored = repository.get_asset_string(
+        inquisitor.assets.host.Host,
+        'www.unknown.com',
+    )
+    assert_equal(stored.ip, '192.0.2.1')
+    assert_equal(stored.emails, list())
@@ -0,0 +1,74 @@
+from nose.tools import *
+import googleapiclient.discovery
+import inquisitor.cache
+import inquisitor.sources.google_search
+import threading
+
+class Service(object):
+
+    # Fakes a Custom Search engine holding the specified number of results
+    def __init__(self, total):
+        self.total = total
+        self.requests = list()
+        self.lock = threading.Lock()
+
+    def cse(self):
+        return self
+
+    def list(self, q, cx, start):
+        service = self
+        class Request(object):
+            def execute(self, http=None):
+                with service.lock:
+                    service.requests.append((q, start))
+                count = max(0, min(10, service.total - start + 1))
+                return {
+                    'searchInformation': {'totalResults': str(service.total)},
+                    'items': [
+                        {
+                            'link': 'http://www.example.com/{}'.format(i),
+                            'snippet': '{} {}'.format(q, i),
+                            'pagemap': {'metatags': [{'unused': 'value'}]},
+                        }
+                        for i in range(start, start + count)
+                    ],
+                }
+        return Request()
+
+def api(service, limit=None):
+    original = googleapiclient.discovery.build
+    googleapiclient.discovery.build = lambda *args, **kwargs: service
+    try:
+        return inquisitor.sources.google_search.GoogleAPI(
+            'key', 'engine', limit=limit
+        )
+    finally:
+        googleapiclient.discovery.build = original
+
+def test_search_fetches_only_available_pages():
+    inquisitor.cache.configure()
+    service = Service(25)
+    items = api(service).search('site:example.com')
+    assert_equal(
+        [item['link'] for item in items],
+        ['http://www.example.com/{}'.format(i) for i in range(1, 26)],
+    )
+    assert_equal(sorted(start for q, start in service.requests), [1, 11, 21])
+    # Only the fields used by transforms are kept
+    assert_equal(sorted(items[0].keys()), ['link', 'snippet'])
+
+def test_search_limit():
+    inquisitor.cache.configure()
+    service = Service(1000)
+    assert_equal(len(api(service, limit=3).search('"@example.com"')), 30)
+    assert_equal(len(service.requests), 3)
+
+def test_search_cached():
+    inquisitor.cache.configure()
+    service = Service(15)
+    google = api(service)
+    assert_equal(google.search('example'), google.search('example'))
+    assert_equal(len(service.requests), 2)
+    # Limited searches reuse the pages of unlimited ones
+    assert_equal(len(api(service, limit=1).search('example')), 10)
+    assert_equal(len(service.requests), 2)
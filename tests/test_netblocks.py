@@ -0,0 +1,62 @@
+from nose.tools import *
+import inquisitor
+import inquisitor.assets.block
+import inquisitor.assets.registrant
+import inquisitor.netblocks
+import os
+import shutil
+import tempfile
+
+Block = inquisitor.assets.block.Block
+Registrant = inquisitor.assets.registrant.Registrant
+
+def setup():
+    global directory
+    directory = tempfile.mkdtemp()
+
+def teardown():
+    shutil.rmtree(directory)
+
+def block(network, owned=None, registrant=None):
+    # Build the asset without performing any RDAP lookups
+    asset = Block.__new__(Block)
+    inquisitor.assets.Asset.__init__(asset, owned=owned)
+    asset.block = inquisitor.assets.block.canonicalize(network)
+    asset.registrant = registrant
+    return asset
+
+def test_longest_match():
+    table = inquisitor.netblocks.PrefixTable()
+    table.add('10.0.0.0/8', 'a')
+    table.add('10.1.0.0/16', 'b')
+    table.add('2001:db8::/32', 'c')
+    assert_equal(table.longest_match('10.1.2.3'), ('10.1.0.0/16', 'b'))
+    assert_equal(table.longest_match('10.2.0.0/16'), ('10.0.0.0/8', 'a'))
+    assert_equal(table.longest_match('2001:db8::1'), ('2001:db8::/32', 'c'))
+    assert_is_none(table.longest_match('11.0.0.1'))
+    assert_equal(
+        table.longest_match('10.1.0.0/16', strict=True),
+        ('10.0.0.0/8', 'a'),
+    )
+    table.remove('10.1.0.0/16')
+    assert_equal(table.longest_match('10.1.2.3'), ('10.0.0.0/8', 'a'))
+    assert_equal(len(table), 2)
+
+def test_owned_block_parent():
+    repository = inquisitor.IntelligenceRepository(
+        os.path.join(directory, 'netblocks.db')
+    )
+    repository.put_asset_object(block('10.0.0.0/8', owned=True))
+    repository.put_asset_object(block('10.1.0.0/16', registrant='ACME CORP'))
+    child = block('10.1.2.0/24', owned=True)
+    repository.put_asset_object(child)
+    assert_equal(child.parent_asset(repository).block, '10.0.0.0/8')
+    # Reclassifying the registrant makes its netblock the closest parent
+    repository.put_asset_string(
+        Registrant, 'Acme Corp', owned=True, overwrite=True
+    )
+    assert_equal(child.parent_asset(repository).block, '10.1.0.0/16')
+    assert_equal(
+        repository.get_owned_block('10.1.2.3').block,
+        '10.1.2.0/24',
+    )
@@ -0,0 +1,106 @@
+from nose.tools import *
+import inquisitor
+import inquisitor.assets.host
+import inquisitor.assets.registrant
+import inquisitor.concurrency
+import inquisitor.planner
+import inquisitor.sources.shodan_search
+import shodan
+import threading
+import time
+
+class Service(object):
+
+    # Fakes the Shodan API finding the same banner for every query
+    def __init__(self):
+        self.queries = list()
+        self.lock = threading.Lock()
+
+    def count(self, query, facets=None):
+        with self.lock:
+            self.queries.append(query)
+        return {'total': 1, 'matches': list()}
+
+    def search(self, query, page=1, minify=True, fields=None):
+        return {
+            'total': 1,
+            'matches': [{
+                'ip_str': '192.0.2.1',
+                'port': 80,
+                'isp': 'ISP',
+                'org': 'ACME',
+                'hostnames': ['www.acme.com'],
+                'domains': ['acme.com'],
+            }],
+        }
+
+def setup():
+    inquisitor.concurrency.configure('shodan')
+
+def teardown():
+    del inquisitor.concurrency.LIMITERS['shodan']
+
+def test_normalize():
+    assert_equal(
+        inquisitor.planner.normalize(' org:"Acme   Corp" '),
+        'org:"acme corp"',
+    )
+
+def test_queries_and_items_shared():
+    service = Service()
+    original = shodan.Shodan
+    shodan.Shodan = lambda api_key: service
+    try:
+        source = inquisitor.sources.shodan_search.ShodanAPI('key')
+    finally:
+        shodan.Shodan = original
+    planner = inquisitor.planner.QueryPlanner()
+    sources = planner.wrap({'shodan': source})
+    repository = inquisitor.IntelligenceRepository(':mem:')
+    host = inquisitor.assets.host.Host('acme.com')
+    registrant = inquisitor.assets.registrant.Registrant('acme.com')
+    # The plain queries of both assets only differ in case
+    assert_equal(planner.plan([host, registrant], sources), (4, 3))
+    found = host.transform(repository, sources)
+    assert_equal(registrant.transform(repository, sources), found)
+    assert_equal(sorted(service.queries), [
+        'acme.com',
+        'hostname:"acme.com"',
+        'org:"ACME.COM"',
+    ])
+    # The banner is only turned into assets once
+    assert_equal(planner.stats(), [('query', 1), ('shodan.banner', 2)])
+    # Assets already transformed are not planned again, nor are queries
+    # issued earlier in the scan
+    again = inquisitor.assets.registrant.Registrant('acme.com')
+    assert_equal(planner.plan([registrant, again], sources), (2, 0))
+    # Cleared planners issue the queries again, keeping their stats
+    planner.clear()
+    assert_equal(planner.plan([registrant, again], sources), (2, 2))
+    assert_equal(planner.stats(), [('query', 1), ('shodan.banner', 2)])
+    # Sources which found nothing are searched again
+    registrant.transforms['shodan'] = list()
+    assert_equal(planner.plan([registrant], sources), (2, 2))
+
+def test_remember():
+    planner = inquisitor.planner.QueryPlanner()
+    calls = list()
+    def fail():
+        calls.append('fail')
+        raise ValueError('Failed')
+    # Failures are not remembered
+    for attempt in range(2):
+        with assert_raises(ValueError):
+            planner.remember('failing', fail)
+    def slow():
+        calls.append('slow')
+        time.sleep(0.05)
+        return 42
+    # Concurrent calls wait for the first one
+    results = inquisitor.concurrency.run_concurrently(
+        lambda index: planner.remember('slow', slow),
+        range(4),
+        workers=4,
+    )
+    assert_equal([result for index, result in results], [42] * 4)
+    assert_equal(calls, ['fail', 'fail', 'slow'])
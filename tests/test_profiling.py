@@ -0,0 +1,56 @@
+from nose.tools import *
+import inquisitor.profiling
+import json
+import os
+import pstats
+import StringIO
+import tempfile
+
+@inquisitor.profiling.timed('test.square')
+def square(value):
+    if value < 0:
+        raise ValueError('Negative')
+    return value * value
+
+def teardown():
+    inquisitor.profiling.disable()
+
+def test_disabled():
+    inquisitor.profiling.disable()
+    stats = inquisitor.profiling.STATS
+    assert_equal(square(3), 9)
+    inquisitor.profiling.count('test.items')
+    assert_not_in('test.square', stats.timers)
+    assert_not_in('test.items', stats.counters)
+
+def test_timers_and_counters():
+    stats = inquisitor.profiling.enable()
+    for value in [1, 2, -1]:
+        try:
+            square(value)
+        except ValueError:
+            pass
+    inquisitor.profiling.count('test.items', 3)
+    inquisitor.profiling.count('test.items')
+    assert_equal(stats.timers['test.square']['calls'], 3)
+    assert_equal(stats.timers['test.square']['errors'], 1)
+    assert_equal(stats.counters, {'test.items': 4})
+    assert_equal(stats.table()[1][:3], ['test.square', 3, 1])
+    output = StringIO.StringIO()
+    stats.dump(output, extra={'cache': dict()})
+    dumped = json.loads(output.getvalue())
+    assert_equal(dumped['timers']['test.square']['calls'], 3)
+    assert_equal(dumped['counters'], {'test.items': 4})
+    assert_equal(dumped['cache'], dict())
+    # Enabling again starts from scratch
+    assert_equal(inquisitor.profiling.enable().timers, dict())
+
+def test_capture():
+    handle, path = tempfile.mkstemp()
+    os.close(handle)
+    try:
+        assert_equal(inquisitor.profiling.capture(path, square, 4), 16)
+        functions = pstats.Stats(path).stats
+        assert_true(any(name == 'square' for f, l, name in functions))
+    finally:
+        os.remove(path)
@@ -0,0 +1,37 @@
+from nose.tools import *
+import inquisitor.assets.host
+import inquisitor.assets.registrant
+import inquisitor.records
+
+Host = inquisitor.assets.host.Host
+
+def test_round_trip():
+    host = Host('www.example.com', owned=True)
+    host.addresses = ['192.0.2.1', '2001:db8::1']
+    host.ip = '192.0.2.1'
+    host.cache_transform_store('google', [
+        Host('mail.example.com'),
+        inquisitor.assets.registrant.Registrant(u'Soci\xe9t\xe9'),
+    ])
+    record = inquisitor.records.encode(host)
+    data = inquisitor.records.decode(Host, record)
+    assert_equal(data, inquisitor.records.data(host))
+    loaded = inquisitor.records.load(Host, data)
+    assert_equal(loaded.transforms, {'google': [
+        ['inquisitor.assets.host', 'mail.example.com'],
+        ['inquisitor.assets.registrant', 'SOCIETE'],
+    ]})
+    # Fields are stored by position and result types by code
+    assert_not_in('addresses', record)
+    assert_not_in('inquisitor.assets', record)
+
+def test_schema():
+    assert_equal(inquisitor.records.schema(Host)[:5], [
+        'owned', 'effective_owned', 'enriched', 'revision', 'transforms',
+    ])
+    assert_equal(inquisitor.records.schema(Host)[5], 'host')
+
+@raises(inquisitor.records.RecordException)
+def test_unsupported_version():
+    record = inquisitor.records.encode(Host('www.example.com'))
+    inquisitor.records.decode(Host, record[0] + '\x7f' + record[2:])
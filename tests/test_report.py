@@ -0,0 +1,60 @@
+from nose.tools import *
+import inquisitor
+import inquisitor.assets.block
+import inquisitor.assets.host
+import inquisitor.assets.registrant
+import inquisitor.report
+import os
+import shutil
+import tempfile
+
+Block = inquisitor.assets.block.Block
+Host = inquisitor.assets.host.Host
+Registrant = inquisitor.assets.registrant.Registrant
+
+def setup():
+    global directory
+    directory = tempfile.mkdtemp()
+
+def teardown():
+    shutil.rmtree(directory)
+
+def shape(node):
+    # Returns the names of the nodes of the tree in a comparable form
+    if 'children' in node:
+        assert_not_in('size', node)
+        return (node['name'], sorted(shape(c) for c in node['children']))
+    assert_equal(node['size'], 1)
+    return node['name']
+
+def test_build_tree():
+    repository = inquisitor.IntelligenceRepository(
+        os.path.join(directory, 'tree.db')
+    )
+    repository.put_asset_string(Registrant, 'Acme', owned=True)
+    network = Block('10.0.0.0/8', owned=True)
+    network.registrant = 'ACME'
+    repository.put_asset_object(network)
+    repository.put_asset_string(Block, '10.1.0.0/16', owned=True)
+    repository.put_asset_string(Host, 'acme.com', owned=True)
+    repository.put_asset_string(Host, 'www.acme.com')
+    server = Host('mail.other.com', owned=True)
+    server.ip = '10.1.2.3'
+    repository.put_asset_object(server)
+    repository.put_asset_string(Host, 'rejected.acme.com', owned=False)
+    progress = list()
+    tree = inquisitor.report.build_tree(
+        repository,
+        progress=lambda done, total: progress.append((done, total)),
+    )
+    # Owned assets hang from their owned parent domains, smallest owned
+    # blocks, or registrants, and the others are left out
+    assert_equal(shape(tree), ('root', sorted([
+        ('Host : acme.com', ['Host : www.acme.com']),
+        ('Registrant : ACME', [
+            ('Block : 10.0.0.0/8', [
+                ('Block : 10.1.0.0/16', ['Host : mail.other.com']),
+            ]),
+        ]),
+    ])))
+    assert_equal(progress[-1], (6, 6))
@@ -0,0 +1,420 @@
+from nose.tools import *
+import inquisitor
+import inquisitor.assets.host
+import inquisitor.assets.linkedin
+import inquisitor.assets.registrant
+import inquisitor.storage
+import os
+import sys
+import shutil
+import tempfile
+import unqlite
+
+Host = inquisitor.assets.host.Host
+LinkedIn = inquisitor.assets.linkedin.LinkedIn
+Registrant = inquisitor.assets.registrant.Registrant
+
+def setup():
+    global directory
+    directory = tempfile.mkdtemp()
+
+def teardown():
+    shutil.rmtree(directory)
+
+def open_repository(name):
+    return inquisitor.IntelligenceRepository(os.path.join(directory, name))
+
+def test_index_lookup():
+    repository = open_repository('index.db')
+    repository.put_asset_string(Registrant, 'Acme Corp', owned=True)
+    repository.put_asset_string(Registrant, 'Other Corp', owned=False)
+    __id, asset = repository.get_asset_string(Registrant, 'ACME CORP')
+    assert_equal(asset.registrant, 'ACME CORP')
+    assert_true(asset.owned)
+    assert_is_none(repository.get_asset_string(Registrant, 'MISSING CORP'))
+
+def test_index_overwrite():
+    repository = open_repository('overwrite.db')
+    repository.put_asset_string(Registrant, 'Acme Corp', owned=True)
+    repository.put_asset_string(
+        Registrant, 'Acme Corp', owned=False, overwrite=True
+    )
+    __id, asset = repository.get_asset_string(Registrant, 'ACME CORP')
+    assert_false(asset.owned)
+    assert_equal(repository.database.count('registrants'), 1)
+
+def test_rebuild_index():
+    repository = open_repository('rebuild.db')
+    repository.put_asset_string(Registrant, 'Acme Corp', owned=True)
+    # Simulate a database created before the index existed
+    for key, value in list(repository.database.match_prefix('index')):
+        del repository.database[key]
+    repository.database.close()
+    repository = open_repository('rebuild.db')
+    assert_false(repository.indexed)
+    assert_is_not_none(repository.get_asset_string(Registrant, 'ACME CORP'))
+    repository.rebuild_index()
+    assert_true(repository.indexed)
+    assert_is_not_none(repository.get_asset_string(Registrant, 'ACME CORP'))
+
+def test_migrate_records():
+    # Simulate a database storing assets as documents
+    path = os.path.join(directory, 'migrate.db')
+    database = unqlite.UnQLite(path)
+    hosts = database.collection('hosts')
+    hosts.create()
+    hosts.store({'data': {
+        'host': 'www.example.com',
+        'parent': 'example.com',
+        'ip': '192.0.2.1',
+        'registrant': None,
+        'emails': [],
+        'nameservers': [],
+        'blocks': [],
+        'owned': True,
+        'effective_owned': True,
+        'transforms': [],
+    }})
+    database['index'] = inquisitor.INDEX_VERSION
+    database['index:hosts:www.example.com'] = '0'
+    database.close()
+    repository = open_repository('migrate.db')
+    assert_is_instance(repository.database.fetch('hosts', 0), str)
+    __id, asset = repository.get_asset_string(Host, 'www.example.com')
+    assert_equal(asset.ip, '192.0.2.1')
+    assert_true(asset.effective_owned)
+    # Fields missing from the documents take their defaults
+    assert_equal(asset.addresses, list())
+    assert_equal(asset.transforms, dict())
+    assert_true(asset.enriched)
+
+def linkedin(username, corporation):
+    asset = LinkedIn(
+        'https://www.linkedin.com/in/{}'.format(username),
+        owned=None,
+    )
+    asset.corporation = corporation
+    return asset
+
+def test_ownership_propagation():
+    repository = open_repository('ownership.db')
+    repository.put_asset_object(linkedin('alice', 'ACME CORP'))
+    __id, asset = repository.get_asset_string(
+        LinkedIn, 'https://www.linkedin.com/in/alice'
+    )
+    assert_false(asset.effective_owned)
+    # Accepting the registrant is pushed to the dependent account
+    repository.put_asset_string(
+        Registrant, 'Acme Corp', owned=True, overwrite=True
+    )
+    __id, asset = repository.get_asset_string(
+        LinkedIn, 'https://www.linkedin.com/in/alice'
+    )
+    assert_true(asset.effective_owned)
+    # Rejecting the registrant again is pushed as well
+    repository.put_asset_string(
+        Registrant, 'Acme Corp', owned=False, overwrite=True
+    )
+    __id, asset = repository.get_asset_string(
+        LinkedIn, 'https://www.linkedin.com/in/alice'
+    )
+    assert_false(asset.effective_owned)
+
+def test_dependents():
+    for backend in sorted(inquisitor.storage.BACKENDS):
+        yield check_dependents, backend
+
+def check_dependents(backend):
+    repository = inquisitor.IntelligenceRepository(
+        os.path.join(directory, '{}-dependents'.format(backend)),
+        backend,
+    )
+    for name in ['www', 'mail']:
+        repository.put_asset_string(Host, '{}.acme.com'.format(name))
+    repository.put_asset_object(linkedin('dave', 'ACME CORP'))
+    # Storing an asset again does not list it twice
+    repository.put_asset_object(linkedin('dave', 'ACME CORP'), overwrite=True)
+    assert_equal(
+        repository.dependents_get(inquisitor.assets.host, 'acme.com'),
+        [
+            ('inquisitor.assets.host', 'mail.acme.com'),
+            ('inquisitor.assets.host', 'www.acme.com'),
+        ],
+    )
+    assert_equal(
+        repository.dependents_get(inquisitor.assets.registrant, 'ACME CORP'),
+        [('inquisitor.assets.linkedin', 'https://www.linkedin.com/in/dave')],
+    )
+    # Single label parents are never stored so nothing depends on them
+    assert_false(repository.database.exists(
+        repository.dependents_key(inquisitor.assets.host, 'com')
+    ))
+    repository.put_asset_string(Host, 'acme.com', owned=True, overwrite=True)
+    assert_true(all(
+        repository.get_asset_string(Host, host)[1].effective_owned
+        for host in ['www.acme.com', 'mail.acme.com']
+    ))
+    repository.database.close()
+
+def test_newly_owned():
+    repository = open_repository('newly_owned.db')
+    repository.put_asset_object(linkedin('bob', 'INITECH'))
+    repository.watch_ownership()
+    repository.put_asset_object(linkedin('carol', 'INITECH'))
+    assert_equal(repository.pop_newly_owned(), [])
+    # Accepting the registrant makes both accounts newly owned
+    repository.put_asset_string(
+        Registrant, 'Initech', owned=True, overwrite=True
+    )
+    assert_equal(
+        sorted(a.linkedin for a in repository.pop_newly_owned()
+               if isinstance(a, LinkedIn)),
+        [
+            'https://www.linkedin.com/in/bob',
+            'https://www.linkedin.com/in/carol',
+        ],
+    )
+    assert_equal(repository.pop_newly_owned(), [])
+    # Assets which are no longer owned are left out
+    repository.put_asset_string(
+        Registrant, 'Initech', owned=False, overwrite=True
+    )
+    repository.put_asset_string(
+        Registrant, 'Initech', owned=True, overwrite=True
+    )
+    repository.put_asset_string(
+        Registrant, 'Initech', owned=False, overwrite=True
+    )
+    assert_equal(repository.pop_newly_owned(), [])
+
+def test_journal():
+    repository = open_repository('journal.db')
+    repository.put_asset_object(linkedin('dave', 'HOOLI'))
+    dave = ('inquisitor.assets.linkedin', 'https://www.linkedin.com/in/dave')
+    repository.watch_ownership()
+    repository.journal_round(1, [dave])
+    __id, asset = repository.get_asset_string(LinkedIn, dave[1])
+    repository.journal_done(asset, ['google'])
+    repository.put_asset_string(
+        Registrant, 'Hooli', owned=True, overwrite=True
+    )
+    repository.database.close()
+    # The progress of the interrupted scan survives reopening the database
+    repository = inquisitor.IntelligenceRepository(
+        os.path.join(directory, 'journal.db')
+    )
+    assert_equal(repository.journal_get(), {
+        'depth': 1,
+        'frontier': [list(dave)],
+    })
+    assert_equal(repository.journal_transformed(['google']), set([dave]))
+    assert_equal(repository.journal_transformed(['google', 'shodan']), set())
+    repository.watch_ownership(resume=True)
+    assert_in(dave[1], [
+        getattr(a, 'linkedin', None) for a in repository.pop_newly_owned()
+    ])
+    repository.journal_clear()
+    assert_is_none(repository.journal_get())
+    assert_equal(repository.journal_transformed([]), set())
+
+def test_journal_killed():
+    path = os.path.join(directory, 'killed.db')
+    repository = open_repository('killed.db')
+    repository.put_asset_object(linkedin('erin', 'HOOLI'))
+    repository.database.close()
+    erin = ('inquisitor.assets.linkedin', 'https://www.linkedin.com/in/erin')
+    # The scan is killed without the database being closed
+    pid = os.fork()
+    if pid == 0:
+        try:
+            repository = inquisitor.IntelligenceRepository(path)
+            repository.journal_round(0, [erin])
+            __id, asset = repository.get_asset_string(LinkedIn, erin[1])
+            repository.journal_done(asset, ['google'])
+        finally:
+            os._exit(0)
+    os.waitpid(pid, 0)
+    repository = inquisitor.IntelligenceRepository(path)
+    assert_equal(repository.journal_get()['frontier'], [list(erin)])
+    assert_equal(repository.journal_transformed(['google']), set([erin]))
+    repository.database.close()
+
+def test_bulk_put():
+    repository = open_repository('bulk.db')
+    repository.put_asset_string(Registrant, 'Globex', owned=False)
+    ids = repository.put_assets_bulk(
+        [
+            Registrant('Globex', owned=True),
+            linkedin('erin', 'GLOBEX'),
+            linkedin('frank', 'UMBRELLA'),
+        ],
+        batch_size=2,
+    )
+    assert_is_none(ids[0])
+    assert_true(all(__id is not None for __id in ids[1:]))
+    # Existing assets are only overwritten if requested
+    assert_false(repository.get_asset_string(Registrant, 'GLOBEX')[1].owned)
+    repository.put_assets_bulk([Registrant('Globex', owned=True)], True)
+    assert_true(repository.get_asset_string(Registrant, 'GLOBEX')[1].owned)
+    # Related assets are stored as well
+    assert_is_not_none(repository.get_asset_string(Registrant, 'UMBRELLA'))
+    __id, asset = repository.get_asset_string(
+        LinkedIn, 'https://www.linkedin.com/in/erin'
+    )
+    assert_true(asset.effective_owned)
+
+def test_bulk_put_rollback():
+    repository = open_repository('rollback.db')
+    repository.put_asset_string(Registrant, 'Kept', owned=True)
+    broken = Registrant('Broken')
+    # Transform results which cannot be encoded fail to be stored
+    broken.transforms = {'google': None}
+    with assert_raises(TypeError):
+        repository.put_assets_bulk([Registrant('Discarded'), broken])
+    assert_is_not_none(repository.get_asset_string(Registrant, 'KEPT'))
+    assert_is_none(repository.get_asset_string(Registrant, 'DISCARDED'))
+    assert_is_none(repository.get_asset_string(Registrant, 'BROKEN'))
+
+def test_iter_assets():
+    repository = open_repository('iter.db')
+    repository.put_asset_object(linkedin('grace', 'VANDELAY'))
+    repository.put_asset_string(
+        Registrant, 'Vandelay', owned=True, overwrite=True
+    )
+    repository.put_asset_string(Registrant, 'Kramerica', owned=False)
+    assert_equal(
+        sorted(a.registrant for a in repository.iter_assets(Registrant)),
+        ['KRAMERICA', 'VANDELAY'],
+    )
+    # Rejected records are never loaded into asset objects
+    loaded = list()
+    load_asset = repository.load_asset
+    repository.load_asset = lambda t, d: loaded.append(d) or load_asset(t, d)
+    owned = list(repository.iter_assets(
+        where=lambda d: d.get('effective_owned')
+    ))
+    assert_equal(len(owned), len(loaded))
+    assert_equal(
+        sorted(type(a).__name__ for a in owned),
+        ['LinkedIn', 'Registrant'],
+    )
+    assert_equal(
+        [d['registrant'] for d in repository.iter_assets(
+            Registrant,
+            where=lambda d: d.get('owned') is False,
+            raw=True,
+        )],
+        ['KRAMERICA'],
+    )
+
+def recount(repository, asset_type):
+    module = sys.modules[asset_type.__module__]
+    del repository.database[repository.counts_key(module)]
+    return repository.get_counts(asset_type)
+
+def test_counts():
+    repository = open_repository('counts.db')
+    assert_equal(repository.get_counts(LinkedIn), {
+        'owned': {True: 0, None: 0, False: 0},
+        'effective': {True: 0, False: 0},
+    })
+    repository.get_counts(Registrant)
+    repository.put_asset_object(linkedin('heidi', 'STARK'))
+    repository.put_asset_object(linkedin('ivan', 'WAYNE'))
+    repository.put_asset_string(Registrant, 'Stark', True, overwrite=True)
+    repository.put_asset_string(Registrant, 'Wayne', False, overwrite=True)
+    counts = repository.get_counts(LinkedIn)
+    assert_equal(counts, {
+        'owned': {True: 0, None: 2, False: 0},
+        'effective': {True: 1, False: 1},
+    })
+    assert_equal(counts, recount(repository, LinkedIn))
+    assert_equal(
+        repository.get_counts(Registrant),
+        recount(repository, Registrant),
+    )
+
+def test_revisions():
+    repository = open_repository('revisions.db')
+    repository.put_asset_object(linkedin('judy', 'CYBERDYNE'))
+    checkpoint = repository.get_revision()
+    changed = lambda: sorted(
+        type(a).__name__ for a in repository.iter_assets(
+            where=lambda d: d.get('revision', 0) > checkpoint
+        )
+    )
+    assert_equal(changed(), [])
+    # Ownership changes pushed to dependents count as changes as well
+    repository.put_asset_string(
+        Registrant, 'Cyberdyne', owned=True, overwrite=True
+    )
+    assert_equal(changed(), ['LinkedIn', 'Registrant'])
+    assert_equal(repository.get_revision(), checkpoint + 2)
+
+def test_rebuild_ownership():
+    repository = open_repository('rebuild_ownership.db')
+    repository.put_asset_string(Registrant, 'Acme Corp', owned=True)
+    repository.put_asset_object(linkedin('bob', 'ACME CORP'))
+    repository.rebuild_index()
+    __id, asset = repository.get_asset_string(
+        LinkedIn, 'https://www.linkedin.com/in/bob'
+    )
+    assert_true(asset.effective_owned)
+
+def fake_enrichment_steps(host):
+    return [[host.fake_whois]]
+
+def fake_whois(host):
+    host.registrant = 'ACME CORP'
+
+def test_deferred_enrichment():
+    repository = open_repository('enrichment.db')
+    repository.put_asset_string(Registrant, 'Acme Corp', owned=True)
+    # Storing hosts performs no lookups and leaves them pending
+    repository.put_asset_string(Host, 'www.acme.com')
+    __id, host = repository.get_asset_string(Host, 'www.acme.com')
+    assert_false(host.enriched)
+    assert_false(host.effective_owned)
+    pending = repository.get_pending_assets()
+    assert_equal(
+        sorted(asset.host for asset in pending),
+        ['acme.com', 'www.acme.com'],
+    )
+    # Enrichment fills in the registrant which makes the hosts owned
+    enrichment_steps = Host.enrichment_steps
+    Host.enrichment_steps = fake_enrichment_steps
+    Host.fake_whois = fake_whois
+    try:
+        assert_equal(repository.enrich_pending(), 2)
+    finally:
+        Host.enrichment_steps = enrichment_steps
+        del Host.fake_whois
+    __id, host = repository.get_asset_string(Host, 'www.acme.com')
+    assert_true(host.enriched)
+    assert_true(host.effective_owned)
+    assert_equal(repository.get_pending_assets(), list())
+
+def test_enriched_pending():
+    repository = open_repository('enriched_pending.db')
+    repository.put_asset_string(Host, 'www.acme.com')
+    __id, host = repository.get_asset_string(Host, 'www.acme.com')
+    host.enriched = True
+    repository.write_asset(__id, host)
+    # Keys of assets enriched since, e.g. by an interrupted run, are cleared
+    # instead of being fetched again forever
+    assert_equal(
+        [asset.host for asset in repository.get_pending_assets()],
+        ['acme.com'],
+    )
+    assert_false(repository.database.exists(repository.asset_key(
+        inquisitor.PENDING_PREFIX,
+        inquisitor.assets.host,
+        'www.acme.com',
+    )))
+    enrichment_steps = Host.enrichment_steps
+    Host.enrichment_steps = lambda host: list()
+    try:
+        assert_equal(repository.enrich_pending(), 1)
+    finally:
+        Host.enrichment_steps = enrichment_steps
+    assert_equal(repository.get_pending_assets(), list())
@@ -0,0 +1,106 @@
+from nose.tools import *
+import dns.message
+import dns.rcode
+import dns.rrset
+import inquisitor.assets.host
+import inquisitor.cache
+import inquisitor.resolver
+import socket
+import threading
+
+RECORDS = {
+    ('dual.example.com.', 'A'): ['192.0.2.1'],
+    ('dual.example.com.', 'AAAA'): ['2001:db8::1'],
+    ('v4.example.com.', 'A'): ['192.0.2.2', '192.0.2.3'],
+}
+
+def serve(sock, queries):
+    # Answers queries from RECORDS like a minimal authoritative server
+    while True:
+        try:
+            data, address = sock.recvfrom(512)
+        except socket.error:
+            return
+        query = dns.message.from_wire(data)
+        question = query.question[0]
+        name = question.name.to_text()
+        rdtype = dns.rdatatype.to_text(question.rdtype)
+        queries.append((name, rdtype))
+        response = dns.message.make_response(query)
+        if not any(key[0] == name for key in RECORDS):
+            response.set_rcode(dns.rcode.NXDOMAIN)
+        elif (name, rdtype) in RECORDS:
+            response.answer.append(dns.rrset.from_text_list(
+                name, 60, 'IN', rdtype, RECORDS[(name, rdtype)]
+            ))
+        sock.sendto(response.to_wire(), address)
+
+def setup():
+    global sock, queries
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind(('127.0.0.1', 0))
+    queries = list()
+    thread = threading.Thread(target=serve, args=(sock, queries))
+    thread.daemon = True
+    thread.start()
+    inquisitor.resolver.configure(
+        'dnspython',
+        nameservers=['127.0.0.1'],
+        port=sock.getsockname()[1],
+        timeout=2,
+    )
+
+def teardown():
+    sock.close()
+    inquisitor.resolver.configure()
+    inquisitor.cache.configure()
+
+def test_resolve_a_and_aaaa():
+    inquisitor.cache.configure()
+    assert_equal(
+        inquisitor.resolver.resolve('dual.example.com'),
+        ['192.0.2.1', '2001:db8::1'],
+    )
+    assert_equal(
+        inquisitor.resolver.resolve('v4.example.com'),
+        ['192.0.2.2', '192.0.2.3'],
+    )
+
+def test_negative_caching():
+    inquisitor.cache.configure(ttls={'nxdomain': 60})
+    del queries[:]
+    assert_equal(inquisitor.resolver.resolve('missing.example.com'), [])
+    assert_equal(inquisitor.resolver.resolve('missing.example.com'), [])
+    assert_equal(queries, [('missing.example.com.', 'A')])
+    # Unresolvable names expire according to their own TTL
+    inquisitor.cache.configure(ttls={'nxdomain': -1})
+    inquisitor.resolver.resolve('missing.example.com')
+    inquisitor.resolver.resolve('missing.example.com')
+    assert_equal(len(queries), 3)
+
+@raises(inquisitor.resolver.ResolverException)
+def test_timeout():
+    inquisitor.cache.configure()
+    silent = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    silent.bind(('127.0.0.1', 0))
+    resolver = inquisitor.resolver.DNSPythonResolver(
+        nameservers=['127.0.0.1'],
+        port=silent.getsockname()[1],
+        timeout=0.2,
+    )
+    try:
+        resolver.resolve('dual.example.com')
+    finally:
+        silent.close()
+
+def test_system_resolver():
+    assert_in('127.0.0.1', inquisitor.resolver.SystemResolver().resolve(
+        'localhost'
+    ))
+
+def test_host_prefers_ipv4():
+    inquisitor.cache.configure()
+    host = inquisitor.assets.host.Host('dual.example.com')
+    host.enrich_ip()
+    assert_equal(host.ip, '192.0.2.1')
+    assert_equal(host.addresses, ['192.0.2.1', '2001:db8::1'])
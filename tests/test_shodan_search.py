@@ -0,0 +1,100 @@
+from nose.tools import *
+import inquisitor.concurrency
+import inquisitor.sources.shodan_search
+import shodan
+import threading
+
+class Service(object):
+
+    # Fakes the Shodan API holding the specified number of results
+    def __init__(self, total):
+        self.total = total
+        self.pages = list()
+        self.lock = threading.Lock()
+
+    def count(self, query, facets=None):
+        return {'total': self.total, 'matches': list()}
+
+    def search(self, query, page=1, minify=True, fields=None):
+        with self.lock:
+            self.pages.append(page)
+        start = (page - 1) * 100
+        return {
+            'total': self.total,
+            'matches': [
+                {
+                    'isp': 'ISP',
+                    'org': 'ORG {}'.format(i),
+                    'hostnames': ['h{}.example.com'.format(i)],
+                    'domains': ['example.com'],
+                    'http': {'host': 'www.example.com', 'html': '<html>'},
+                    'data': 'banner',
+                }
+                for i in range(start, min(start + 100, self.total))
+            ],
+        }
+
+def setup():
+    inquisitor.concurrency.configure('shodan')
+
+def teardown():
+    del inquisitor.concurrency.LIMITERS['shodan']
+
+def api(service, limit=None):
+    original = shodan.Shodan
+    shodan.Shodan = lambda api_key: service
+    try:
+        return inquisitor.sources.shodan_search.ShodanAPI('key', limit=limit)
+    finally:
+        shodan.Shodan = original
+
+def test_search_fetches_counted_pages():
+    service = Service(250)
+    items = api(service).search('net:192.0.2.0/24')
+    assert_equal(sorted(service.pages), [1, 2, 3])
+    assert_equal(
+        [item['org'] for item in items],
+        ['ORG {}'.format(i) for i in range(250)],
+    )
+    # Only the properties used by transforms are kept
+    assert_equal(items[0], {
+        'isp': 'ISP',
+        'org': 'ORG 0',
+        'hostnames': ['h0.example.com'],
+        'domains': ['example.com'],
+        'http': {'host': 'www.example.com'},
+    })
+
+def test_search_limit():
+    service = Service(1000)
+    assert_equal(len(api(service, limit=2).search('org:"Example"')), 200)
+    assert_equal(sorted(service.pages), [1, 2])
+
+def test_search_empty():
+    service = Service(0)
+    assert_equal(api(service).search('org:"Nobody"'), [])
+    assert_equal(service.pages, [])
+
+def test_search_workers_limited():
+    service = Service(5000)
+    used = list()
+    original = inquisitor.concurrency.run_concurrently
+    def run_concurrently(function, items, workers=1):
+        used.append(workers)
+        return original(function, items, workers=workers)
+    inquisitor.concurrency.run_concurrently = run_concurrently
+    try:
+        assert_equal(len(api(service).search('org:"Example"')), 5000)
+    finally:
+        inquisitor.concurrency.run_concurrently = original
+    # Pages are fetched by a few threads rather than one thread per page
+    assert_equal(used, [inquisitor.sources.shodan_search.PAGE_WORKERS])
+    inquisitor.concurrency.configure('shodan', concurrency=2)
+    try:
+        used = list()
+        inquisitor.concurrency.run_concurrently = run_concurrently
+        api(service).search('org:"Example"')
+    finally:
+        inquisitor.concurrency.run_concurrently = original
+        inquisitor.concurrency.configure('shodan')
+    assert_equal(used, [2])
@@ -0,0 +1,121 @@
+from nose.tools import *
+import inquisitor
+import inquisitor.assets.registrant
+import inquisitor.storage
+import os
+import shutil
+import tempfile
+
+Registrant = inquisitor.assets.registrant.Registrant
+
+def setup():
+    global directory
+    directory = tempfile.mkdtemp()
+
+def teardown():
+    shutil.rmtree(directory)
+
+def columns(identifier, owned=None, effective_owned=False):
+    return {
+        'identifier': identifier,
+        'owned': owned,
+        'effective_owned': effective_owned,
+        'registrant': None,
+        'parent': None,
+    }
+
+def test_backends():
+    for backend in sorted(inquisitor.storage.BACKENDS):
+        yield check_records, backend
+        yield check_key_values, backend
+        yield check_rollback, backend
+        yield check_autocommit, backend
+        yield check_repository, backend
+
+def connect(backend, name):
+    path = os.path.join(directory, '{}-{}'.format(backend, name))
+    return inquisitor.storage.connect(path, backend)
+
+def check_records(backend):
+    storage = connect(backend, 'records')
+    storage.create('hosts')
+    first = storage.store('hosts', '\x93\x00\xff', columns('a.example.com'))
+    second = storage.store(
+        'hosts', 'second', columns('b.example.com', True, True)
+    )
+    storage.update('hosts', first, 'first', columns('a.example.com', False))
+    storage.index('hosts', 'a.example.com', first)
+    assert_equal(storage.count('hosts'), 2)
+    assert_equal(storage.fetch('hosts', first), 'first')
+    assert_equal(storage.lookup('hosts', 'a.example.com'), first)
+    assert_equal(
+        list(storage.records('hosts')),
+        [(first, 'first'), (second, 'second')],
+    )
+    # Unindexed backends may return every record but never skip a match
+    assert_in(
+        (second, 'second'),
+        list(storage.records('hosts', {'effective_owned': True})),
+    )
+    storage.close()
+
+def check_key_values(backend):
+    storage = connect(backend, 'keys')
+    storage['journal:hosts:a'] = '1'
+    storage['journal:hosts:b'] = '2'
+    storage['journals'] = '3'
+    assert_true(storage.exists('journal:hosts:a'))
+    assert_equal(storage['journal:hosts:b'], '2')
+    del storage['journal:hosts:a']
+    assert_equal(
+        sorted(storage.match_prefix('journal:')),
+        [('journal:hosts:b', '2')],
+    )
+    storage.close()
+
+def check_rollback(backend):
+    storage = connect(backend, 'rollback')
+    storage['kept'] = '1'
+    storage.commit()
+    storage.begin()
+    storage['discarded'] = '1'
+    storage.rollback()
+    assert_true(storage.exists('kept'))
+    assert_false(storage.exists('discarded'))
+    storage.close()
+
+def check_autocommit(backend):
+    storage = connect(backend, 'autocommit')
+    storage.create('hosts')
+    storage['kept'] = '1'
+    __id = storage.store('hosts', 'record', columns('a.example.com'))
+    # Writes outside of transactions survive the storage never being closed
+    del storage
+    storage = connect(backend, 'autocommit')
+    storage.create('hosts')
+    assert_equal(storage['kept'], '1')
+    assert_equal(storage.fetch('hosts', __id), 'record')
+    storage.close()
+
+def check_repository(backend):
+    path = os.path.join(directory, '{}-repository'.format(backend))
+    repository = inquisitor.IntelligenceRepository(path, backend)
+    repository.put_asset_string(Registrant, 'Acme Corp', owned=True)
+    repository.put_asset_string(Registrant, 'Other Corp', owned=False)
+    repository.database.close()
+    # Existing databases are opened with the backend that created them
+    assert_equal(inquisitor.storage.backend(path), backend)
+    repository = inquisitor.IntelligenceRepository(path)
+    assert_is_not_none(repository.get_asset_string(Registrant, 'ACME CORP'))
+    assert_equal(
+        [a.registrant for a in repository.iter_assets(
+            match={'effective_owned': True},
+        )],
+        ['ACME CORP'],
+    )
+    repository.database.close()
+
+def test_new_databases():
+    assert_equal(inquisitor.storage.backend('new.db'), 'unqlite')
+    assert_equal(inquisitor.storage.backend('new.sqlite'), 'sqlite')
+    assert_equal(inquisitor.storage.backend(':mem:'), 'unqlite')